@@ -0,0 +1,241 @@
+# async_sheet_manager.py
+# 저장소(SheetManager/SqliteStorage) 비동기 래퍼 (전용 스레드 풀에서 실행)
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sheet_manager import SheetManager
+
+class StorageUnavailable(RuntimeError):
+    """저장소가 아직 연결되지 않았거나 연결에 실패함"""
+
+class _NotConnected:
+    """연결 전 자리 표시 (어떤 메서드를 불러도 StorageUnavailable)"""
+    
+    def __init__(self, error=None):
+        self.error = error
+    
+    def __getattr__(self, name):
+        if self.error is not None:
+            raise StorageUnavailable(f'저장소 연결 실패: {self.error}')
+        raise StorageUnavailable('저장소 연결 중')
+
+class AsyncSheetManager:
+    """저장소 메서드를 전용 스레드 풀에서 실행하는 비동기 래퍼"""
+    
+    # gspread 호출은 동기 HTTP 요청이라 이벤트 루프에서 직접 부르면 봇 전체가 멈춤.
+    # 크기가 제한된 스레드 풀에서 실행해 여러 사용자의 명령어가 I/O를 겹쳐 처리하도록 함
+    
+    # self.sheet는 StorageBackend 구현 (SheetManager 또는 SqliteStorage)
+    # sheet_manager 없이 만들면 open()이 끝날 때까지 명령어는 wait_ready()에서 기다릴 수 있음
+    
+    def __init__(self, sheet_manager=None, max_workers=4, metrics=None):
+        self.sheet = sheet_manager if sheet_manager is not None else _NotConnected()
+        self._ready = asyncio.Event()
+        if sheet_manager is not None:
+            self._ready.set()
+        # metrics.Metrics를 넘기면 저장소 메서드별 호출 횟수/오류/지연 시간 기록
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='sheet'
+        )
+        # 트랜잭션용 사용자별 잠금
+        self._user_locks = {}
+    
+    @property
+    def connected(self):
+        """저장소 연결 완료 여부"""
+        return not isinstance(self.sheet, _NotConnected)
+    
+    async def open(self, factory):
+        """factory()로 저장소 생성 (연결 과정도 스레드 풀에서 실행)"""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sheet-connect')
+        try:
+            loop = asyncio.get_running_loop()
+            self.sheet = await loop.run_in_executor(executor, factory)
+            return self.sheet
+        except Exception as e:
+            self.sheet = _NotConnected(e)
+            raise
+        finally:
+            executor.shutdown(wait=False)
+            self._ready.set()
+    
+    async def wait_ready(self, timeout=None):
+        """연결이 끝날 때까지 최대 timeout초 대기 (연결됐으면 True)"""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return self.connected
+    
+    @classmethod
+    async def create(cls, factory, max_workers=4, metrics=None):
+        """factory()로 저장소를 만들어 연결된 래퍼 반환"""
+        manager = cls(max_workers=max_workers, metrics=metrics)
+        try:
+            await manager.open(factory)
+        except Exception:
+            manager._executor.shutdown(wait=False)
+            raise
+        return manager
+    
+    @classmethod
+    async def connect(cls, credentials_file, sheet_id, max_workers=4, metrics=None, **options):
+        """구글 시트 연결 (options는 SheetManager로 전달)"""
+        return await cls.create(
+            functools.partial(SheetManager, credentials_file, sheet_id, metrics=metrics, **options),
+            max_workers=max_workers,
+            metrics=metrics
+        )
+    
+    async def _run(self, func, *args, **kwargs):
+        """동기 메서드를 스레드 풀에서 실행 (호출한 작업의 contextvars 유지)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = loop.run_in_executor(
+            self._executor,
+            functools.partial(context.run, func, *args, **kwargs)
+        )
+        if self.metrics is None:
+            return await call
+        
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await call
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.record_storage(func.__name__, time.perf_counter() - start, failed)
+    
+    async def close(self):
+        """남은 변경 사항과 로그 기록 후 스레드 풀 종료 (진행 중인 요청은 마무리)"""
+        if self.connected:
+            await self._run(self.sheet.close)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+    
+    # ============================================
+    # 사용자 관리
+    # ============================================
+    
+    async def find_user(self, user_id):
+        return await self._run(self.sheet.find_user, user_id)
+    
+    async def get_all_users(self):
+        return await self._run(self.sheet.get_all_users)
+    
+    async def create_user(self, user_id, name, initial_galleons=100):
+        return await self._run(self.sheet.create_user, user_id, name, initial_galleons)
+    
+    async def update_user(self, user_id, updates):
+        return await self._run(self.sheet.update_user, user_id, updates)
+    
+    async def update_users(self, updates_by_user):
+        return await self._run(self.sheet.update_users, updates_by_user)
+    
+    async def defer_user_updates(self, updates_by_user):
+        return await self._run(self.sheet.defer_user_updates, updates_by_user)
+    
+    async def flush_users(self):
+        return await self._run(self.sheet.flush_users)
+    
+    async def invalidate_users(self, user_id=None):
+        return await self._run(self.sheet.invalidate_users, user_id)
+    
+    @contextlib.asynccontextmanager
+    async def transaction(self, *user_ids, deferred=False):
+        """사용자별 잠금을 잡고 트랜잭션 실행, 블록이 끝나면 변경을 한 번에 커밋"""
+        # 블록 안에서 예외가 나거나 tx.abort()를 부르면 아무것도 기록하지 않음.
+        # 커밋 결과는 블록이 끝난 뒤 tx.committed로 확인
+        # deferred=True면 캐시에만 바로 반영하고 시트에는 짧은 시간 동안 모아서 기록
+        # 교착 상태를 막기 위해 항상 같은 순서로 잠금
+        keys = sorted({str(user_id).strip() for user_id in user_ids})
+        
+        async with contextlib.AsyncExitStack() as stack:
+            for key in keys:
+                lock = self._user_locks.setdefault(key, asyncio.Lock())
+                await stack.enter_async_context(lock)
+            
+            tx = await self._run(self.sheet.begin_transaction, keys)
+            tx.deferred = deferred
+            yield tx
+            await self._run(self.sheet.commit_transaction, tx)
+    
+    # ============================================
+    # 순위
+    # ============================================
+    
+    async def get_top_users(self, limit=10):
+        return await self._run(self.sheet.get_top_users, limit)
+    
+    async def get_user_rank(self, user_id):
+        return await self._run(self.sheet.get_user_rank, user_id)
+    
+    async def get_house_ranking(self):
+        return await self._run(self.sheet.get_house_ranking)
+    
+    # ============================================
+    # 아이템 관리
+    # ============================================
+    
+    async def reload_items(self):
+        return await self._run(self.sheet.reload_items)
+    
+    async def get_catalog_version(self):
+        return await self._run(self.sheet.get_catalog_version)
+    
+    async def find_item(self, item_name):
+        return await self._run(self.sheet.find_item, item_name)
+    
+    async def get_all_items(self, sellable_only=False):
+        return await self._run(self.sheet.get_all_items, sellable_only)
+    
+    async def add_item_to_user(self, user_id, item_name, count=1):
+        """사용자에게 아이템 추가 (!구매/!양도 트랜잭션과 같은 사용자별 잠금을 잡음)"""
+        async with self.transaction(user_id) as tx:
+            if not tx.user(user_id):
+                tx.abort()
+                return False
+            tx.add_item(user_id, item_name, count)
+        return tx.committed
+    
+    async def remove_item_from_user(self, user_id, item_name, count=1):
+        """사용자에게서 아이템 제거 (부족하면 False, 트랜잭션과 같은 사용자별 잠금을 잡음)"""
+        async with self.transaction(user_id) as tx:
+            if not tx.user(user_id) or not tx.remove_item(user_id, item_name, count):
+                tx.abort()
+                return False
+        return tx.committed
+    
+    async def get_user_items(self, user_id):
+        return await self._run(self.sheet.get_user_items, user_id)
+    
+    async def count_user_item(self, user_id, item_name):
+        return await self._run(self.sheet.count_user_item, user_id, item_name)
+    
+    async def migrate_inventories(self):
+        return await self._run(self.sheet.migrate_inventories)
+    
+    # ============================================
+    # 로그
+    # ============================================
+    
+    async def log_message(self, user, command, content):
+        return await self._run(self.sheet.log_message, user, command, content)
+    
+    async def flush_logs(self):
+        return await self._run(self.sheet.flush_logs)
+    
+    async def get_recent_logs(self, limit=10):
+        return await self._run(self.sheet.get_recent_logs, limit)
+    
+    async def get_user_logs(self, user_name, limit=10):
+        return await self._run(self.sheet.get_user_logs, user_name, limit)
@@ -0,0 +1,372 @@
+# benchmark.py
+# 명령어 동시 부하 벤치마크 (가짜 구글 시트 사용, 디스코드 연결 없음)
+
+# 사용 예:
+#     python benchmark.py --users 50 --commands 20 --latency 0.15
+#     python benchmark.py --backend sqlite --output after.json --compare before.json
+#
+# 시뮬레이션 사용자 N명이 동시에 명령어를 차례로 실행하고,
+# 명령어별 처리량/지연 시간(p50/p95/p99)/이벤트 루프 멈춤 시간/Sheets API 요청 수를 JSON으로 저장
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from async_sheet_manager import AsyncSheetManager
+from cogs.economy_cog import EconomyCog
+from cogs.fun_cog import FunCog
+from cogs.gambling_cog import GamblingCog
+from fake_sheets import FakeClient, call_tag
+from scheduler import RequestScheduler
+from sheet_manager import SHEET_HEADERS, SheetManager
+from sqlite_storage import SqliteStorage
+
+SHEET_KEY = 'benchmark'
+
+# 상점 아이템 (아이템명, 설명, 가격, 판매여부, 사용가능여부)
+ITEMS = [
+    ['포션', '체력을 회복한다', 10, 'TRUE', 'TRUE'],
+    ['쿠키', '달콤하다/바삭하다', 5, 'TRUE', 'TRUE'],
+    ['빗자루', '하늘을 난다', 120, 'TRUE', 'FALSE'],
+    ['수정구', '미래가 보인다', 300, 'TRUE', 'FALSE'],
+    ['부엉이 깃털', '', 20, 'FALSE', 'FALSE']
+]
+SELLABLE = [item[0] for item in ITEMS if item[3] == 'TRUE']
+
+# 기본 명령어 비율
+DEFAULT_MIX = 'buy=3,bet=3,transfer=2,tarot=2,pouch=1,shop=1'
+
+class FakeMember:
+    """명령어에 넘길 가짜 discord.Member"""
+    
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f'<@{user_id}>'
+
+class FakeContext:
+    """명령어에 넘길 가짜 commands.Context (보낸 메시지만 기록)"""
+    
+    def __init__(self, author, sheet=None):
+        self.author = author
+        # 봇에서는 before_invoke가 서버의 저장소로 지정
+        self.sheet = sheet
+        self.replies = []
+    
+    async def send(self, content=None, **kwargs):
+        self.replies.append(content)
+
+async def _invoke(cog, command_name, ctx, *args, **kwargs):
+    """봇에 등록하지 않은 Cog의 명령어 본문 실행 (인자 변환은 건너뜀)"""
+    command = getattr(cog, command_name)
+    await command.callback(cog, ctx, *args, **kwargs)
+
+async def _buy(cogs, ctx, others, rng):
+    await _invoke(cogs['economy'], 'buy', ctx, item_name=rng.choice(SELLABLE))
+
+async def _bet(cogs, ctx, others, rng):
+    await _invoke(cogs['gambling'], 'bet', ctx, rng.randint(1, 20))
+
+async def _transfer(cogs, ctx, others, rng):
+    await _invoke(cogs['economy'], 'transfer', ctx, rng.choice(others), str(rng.randint(1, 5)))
+
+async def _tarot(cogs, ctx, others, rng):
+    await _invoke(cogs['fun'], 'tarot', ctx)
+
+async def _pouch(cogs, ctx, others, rng):
+    await _invoke(cogs['economy'], 'pouch', ctx)
+
+async def _shop(cogs, ctx, others, rng):
+    await _invoke(cogs['economy'], 'shop', ctx)
+
+COMMANDS = {
+    'buy': _buy,
+    'bet': _bet,
+    'transfer': _transfer,
+    'tarot': _tarot,
+    'pouch': _pouch,
+    'shop': _shop
+}
+
+def parse_mix(text):
+    """"buy=3,bet=1" → {'buy': 3, 'bet': 1}"""
+    mix = {}
+    for entry in text.split(','):
+        name, _, weight = entry.partition('=')
+        name = name.strip()
+        if name not in COMMANDS:
+            raise ValueError(f'알 수 없는 명령어: {name} (사용 가능: {", ".join(COMMANDS)})')
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, p):
+    """정렬된 값의 p백분위수 (nearest-rank)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies):
+    """지연 시간 목록(초) → 밀리초 통계"""
+    values = sorted(latencies)
+    if not values:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'mean_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2)
+    }
+
+def seed_spreadsheet(client, users):
+    """사용자/아이템 시트 채우기 (요청 수에 포함되지 않음)"""
+    spreadsheet = client.open_by_key(SHEET_KEY)
+    houses = ['그리핀도르', '슬리데린', '래번클로', '후플푸프']
+    
+    rows = [SHEET_HEADERS['사용자']]
+    for member in users:
+        rows.append([member.id, member.name, 1000, '포션:3,쿠키', '', houses[member.id % 4], '', 0, '', '', 0])
+    spreadsheet.load_rows('사용자', rows)
+    spreadsheet.load_rows('아이템', [SHEET_HEADERS['아이템']] + ITEMS)
+    spreadsheet.load_rows('로그', [SHEET_HEADERS['로그']])
+    client.reset_counters()
+
+def create_storage(args, client, workdir, scheduler=None):
+    """--backend 설정에 맞는 저장소 생성"""
+    sheet = SheetManager(
+        None, SHEET_KEY, client=client, scheduler=scheduler,
+        log_batch_size=args.log_batch_size,
+        log_flush_interval=args.log_flush_interval,
+        write_behind=args.write_behind,
+        journal_file=os.path.join(workdir, 'journal.log'),
+        flush_interval=args.flush_interval
+    )
+    if args.backend == 'sqlite':
+        return SqliteStorage(os.path.join(workdir, 'bench.db'), mirror=sheet)
+    return sheet
+
+async def watch_event_loop(interval, threshold, stats, stop):
+    """이벤트 루프가 interval보다 늦게 깨어난 시간(멈춤) 측정"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - start - interval
+        stats['samples'] += 1
+        stats['max_lag_ms'] = max(stats['max_lag_ms'], lag * 1000)
+        if lag > threshold:
+            stats['blocked_ms'] += lag * 1000
+            stats['stalls'] += 1
+
+async def run_user(cogs, sheet, member, others, plan, rng, think, results):
+    """한 사용자가 계획된 명령어를 차례로 실행"""
+    for name in plan:
+        ctx = FakeContext(member, sheet)
+        token = call_tag.set(name)
+        start = time.perf_counter()
+        error = None
+        try:
+            await COMMANDS[name](cogs, ctx, others, rng)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        finally:
+            elapsed = time.perf_counter() - start
+            call_tag.reset(token)
+        
+        results.append((name, elapsed, error))
+        if think:
+            await asyncio.sleep(rng.uniform(0, think * 2))
+
+async def run_benchmark(args):
+    """벤치마크 1회 실행 후 결과 딕셔너리 반환"""
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    
+    latency = args.latency
+    if args.jitter:
+        latency = lambda: max(0.0, rng.gauss(args.latency, args.jitter))
+    client = FakeClient(latency=latency, rpm_limit=args.rpm)
+    
+    members = [FakeMember(100000 + i, f'user{i}') for i in range(args.users)]
+    seed_spreadsheet(client, members)
+    
+    scheduler = None
+    if args.rate:
+        scheduler = RequestScheduler(rate_per_minute=args.rate, burst=args.burst)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_start = time.perf_counter()
+        sheet = await AsyncSheetManager.create(
+            lambda: create_storage(args, client, workdir, scheduler),
+            max_workers=args.max_workers
+        )
+        if not args.cold:
+            # 캐시를 채운 상태(정상 운영 상태)에서 측정
+            await sheet.find_user(members[0].id)
+            await sheet.get_catalog_version()
+        setup = {'seconds': round(time.perf_counter() - setup_start, 3), 'api_calls': client.total_calls}
+        client.reset_counters()
+        
+        cogs = {
+            'economy': EconomyCog(None),
+            'gambling': GamblingCog(None),
+            'fun': FunCog(None)
+        }
+        
+        results = []
+        loop_stats = {'samples': 0, 'max_lag_ms': 0.0, 'blocked_ms': 0.0, 'stalls': 0}
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(
+            watch_event_loop(args.loop_interval, args.loop_threshold, loop_stats, stop)
+        )
+        
+        tasks = []
+        for member in members:
+            others = [m for m in members if m is not member] or [member]
+            plan = rng.choices(names, weights, k=args.commands)
+            user_rng = random.Random(rng.random())
+            tasks.append(run_user(cogs, sheet, member, others, plan, user_rng, args.think, results))
+        
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - start
+        
+        stop.set()
+        await watcher
+        
+        # 명령어가 끝난 뒤 남은 백그라운드 기록(로그/쓰기 지연)까지 요청 수에 포함
+        await sheet.flush_users()
+        await sheet.flush_logs()
+        await sheet.close()
+    
+    commands = {}
+    for name in names:
+        entries = [r for r in results if r[0] == name]
+        api_calls = client.calls_by_tag.get(name, 0)
+        errors = [r[2] for r in entries if r[2]]
+        commands[name] = {
+            'count': len(entries),
+            'errors': len(errors),
+            **summarize([r[1] for r in entries]),
+            'api_calls': api_calls,
+            'api_calls_per_command': round(api_calls / len(entries), 3) if entries else 0.0,
+            'sample_errors': sorted(set(errors))[:5]
+        }
+    
+    total = len(results)
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            key: value for key, value in vars(args).items()
+            if key not in ('output', 'compare')
+        },
+        'setup': setup,
+        'duration_s': round(duration, 3),
+        'throughput_per_s': round(total / duration, 2) if duration else 0.0,
+        'overall': {
+            'count': total,
+            'errors': sum(1 for r in results if r[2]),
+            **summarize([r[1] for r in results]),
+            'api_calls': client.total_calls,
+            'api_calls_per_command': round(client.total_calls / total, 3) if total else 0.0
+        },
+        'commands': commands,
+        'event_loop': {key: round(value, 2) for key, value in loop_stats.items()},
+        'api': {
+            'total': client.total_calls,
+            'background': client.calls_by_tag.get(None, 0),
+            'rejected_429': client.rejected,
+            'by_method': dict(client.calls)
+        },
+        'scheduler': {
+            'max_queue_depth': scheduler.max_queue_depth,
+            'retries': scheduler.retries,
+            'throttled_429': scheduler.throttled
+        } if scheduler else None
+    }
+
+def print_report(result, baseline=None):
+    """결과 표 출력 (baseline이 있으면 변화량도 표시)"""
+    def delta(new, old):
+        if old in (None, 0):
+            return ''
+        return f' ({(new - old) / old * 100:+.0f}%)'
+    
+    print('=' * 78)
+    print(f"[BENCH] 처리량: {result['throughput_per_s']}/s"
+          + (delta(result['throughput_per_s'], baseline['throughput_per_s']) if baseline else '')
+          + f"  명령어 {result['overall']['count']}개 / {result['duration_s']}초"
+          + f"  오류 {result['overall']['errors']}개")
+    print('-' * 78)
+    print(f"{'명령어':<10}{'횟수':>6}{'오류':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'API/명령':>10}")
+    
+    rows = list(result['commands'].items()) + [('전체', result['overall'])]
+    for name, stats in rows:
+        old = None
+        if baseline:
+            old = baseline['overall'] if name == '전체' else baseline['commands'].get(name)
+        line = (f"{name:<10}{stats['count']:>6}{stats['errors']:>6}{stats['p50_ms']:>10}"
+                f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['api_calls_per_command']:>10}")
+        if old:
+            line += delta(stats['p95_ms'], old['p95_ms'])
+        print(line)
+    
+    print('-' * 78)
+    loop = result['event_loop']
+    api = result['api']
+    print(f"[BENCH] 이벤트 루프: 최대 지연 {loop['max_lag_ms']}ms, 멈춤 {loop['stalls']}회 / {loop['blocked_ms']}ms")
+    print(f"[BENCH] API 요청: 총 {api['total']}회 (백그라운드 {api['background']}회, 429 거절 {api['rejected_429']}회)")
+    if result.get('scheduler'):
+        scheduler = result['scheduler']
+        print(f"[BENCH] 스케줄러: 최대 대기열 {scheduler['max_queue_depth']}개, "
+              f"재시도 {scheduler['retries']}회 (429 {scheduler['throttled_429']}회)")
+    print('=' * 78)
+
+def main():
+    parser = argparse.ArgumentParser(description='디스코드 RPG 봇 명령어 부하 벤치마크')
+    parser.add_argument('--users', type=int, default=50, help='동시 사용자 수')
+    parser.add_argument('--commands', type=int, default=20, help='사용자당 명령어 수')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'명령어 비율 (기본: {DEFAULT_MIX})')
+    parser.add_argument('--think', type=float, default=0.0, help='명령어 사이 평균 대기 시간(초)')
+    parser.add_argument('--latency', type=float, default=0.15, help='Sheets 요청당 지연 시간(초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='지연 시간 표준편차(초)')
+    parser.add_argument('--rpm', type=int, default=None, help='분당 요청 한도 (기본: 무제한)')
+    parser.add_argument('--rate', type=float, default=None, help='요청 스케줄러 분당 속도 (기본: 스케줄러 없음)')
+    parser.add_argument('--burst', type=int, default=10, help='요청 스케줄러 순간 최대 요청 수')
+    parser.add_argument('--backend', choices=['sheets', 'sqlite'], default='sheets')
+    parser.add_argument('--max-workers', type=int, default=4, help='저장소 스레드 풀 크기')
+    parser.add_argument('--write-behind', action='store_true', help='쓰기 지연 모드 사용')
+    parser.add_argument('--flush-interval', type=float, default=60.0, help='쓰기 지연 기록 간격(초)')
+    parser.add_argument('--log-batch-size', type=int, default=20)
+    parser.add_argument('--log-flush-interval', type=float, default=10.0)
+    parser.add_argument('--cold', action='store_true', help='캐시를 채우지 않고 시작')
+    parser.add_argument('--loop-interval', type=float, default=0.01, help='이벤트 루프 측정 간격(초)')
+    parser.add_argument('--loop-threshold', type=float, default=0.05, help='멈춤으로 볼 지연(초)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='결과 JSON 경로 (기본: benchmark_날짜_시간.json)')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    result = asyncio.run(run_benchmark(args))
+    print_report(result, baseline)
+    
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f'[BENCH] 결과 저장: {output}')
+
+if __name__ == '__main__':
+    main()
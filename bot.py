@@ -5,49 +5,213 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+import time
+import typing
 from dotenv import load_dotenv
+from async_sheet_manager import AsyncSheetManager, StorageUnavailable
+from guild_storage import GuildRegistry, StoragePool, uses_storage
+from metrics import Metrics, current_command, start_metrics_server
+from scheduler import RequestScheduler
 from sheet_manager import SheetManager
+from sqlite_storage import SqliteStorage
 
 load_dotenv()
 
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
 GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
+SHEET_MAX_WORKERS = int(os.getenv('SHEET_MAX_WORKERS', '4'))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '20'))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '10'))
+LOG_BUFFER_SIZE = int(os.getenv('LOG_BUFFER_SIZE', '1000'))
+LOG_ROTATE_ROWS = int(os.getenv('LOG_ROTATE_ROWS', '5000'))
+LOG_ROTATE_MONTHLY = os.getenv('LOG_ROTATE_MONTHLY', '1') == '1'
+LOG_ARCHIVE_SHEET_ID = os.getenv('LOG_ARCHIVE_SHEET_ID') or None
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', 'log_archive')
+LOG_KEEP_PERIODS = int(os.getenv('LOG_KEEP_PERIODS', '6'))
+SHEET_WRITE_BEHIND = os.getenv('SHEET_WRITE_BEHIND', '0') == '1'
+SHEET_JOURNAL_FILE = os.getenv('SHEET_JOURNAL_FILE', 'sheet_journal.log')
+SHEET_FLUSH_INTERVAL = float(os.getenv('SHEET_FLUSH_INTERVAL', '60'))
+SHEET_COALESCE_WINDOW = float(os.getenv('SHEET_COALESCE_WINDOW', '2'))
+ATTENDANCE_REWARD = int(os.getenv('ATTENDANCE_REWARD', '50'))
+ITEM_CACHE_TTL = float(os.getenv('ITEM_CACHE_TTL', '300'))
+SHEET_SNAPSHOT_FILE = os.getenv('SHEET_SNAPSHOT_FILE', 'sheet_snapshot.json.gz') or None
+SHEET_SNAPSHOT_INTERVAL = float(os.getenv('SHEET_SNAPSHOT_INTERVAL', '300'))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sheets')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'bot.db')
+SQLITE_MIRROR_SHEETS = os.getenv('SQLITE_MIRROR_SHEETS', '1') == '1'
+SHEETS_RATE_PER_MINUTE = float(os.getenv('SHEETS_RATE_PER_MINUTE', '50'))
+SHEETS_BURST = int(os.getenv('SHEETS_BURST', '10'))
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '5'))
+SHEETS_HTTP_POOL_SIZE = int(os.getenv('SHEETS_HTTP_POOL_SIZE') or SHEET_MAX_WORKERS + 4)
+SHEETS_HTTP_TIMEOUT = float(os.getenv('SHEETS_HTTP_TIMEOUT', '60'))
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+STARTUP_WAIT_SECONDS = float(os.getenv('STARTUP_WAIT_SECONDS', '15'))
+# 이 시간(초)보다 오래 걸리는 접두사 명령어에는 입력 중 표시
+TYPING_DELAY = 1.0
+GUILD_SHEETS_FILE = os.getenv('GUILD_SHEETS_FILE', 'guild_sheets.json')
+GUILD_POOL_SIZE = int(os.getenv('GUILD_POOL_SIZE', '8'))
+BOT_SHARDED = os.getenv('BOT_SHARDED', '0') == '1'
+BOT_SHARD_COUNT = int(os.getenv('BOT_SHARD_COUNT')) if os.getenv('BOT_SHARD_COUNT') else None
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(
+bot_options = dict(
     command_prefix='!',
     intents=intents,
     help_command=None
 )
+if BOT_SHARDED:
+    # 서버가 많으면 게이트웨이 연결을 샤드로 나눔 (샤드 수를 비워 두면 디스코드 권장값 사용)
+    bot = commands.AutoShardedBot(shard_count=BOT_SHARD_COUNT, **bot_options)
+else:
+    bot = commands.Bot(**bot_options)
 
+# 기본 스프레드시트(GOOGLE_SHEET_ID) 저장소, 서버별 스프레드시트는 bot.storage_pool에서 관리
 bot.sheet_manager = None
+bot.storage_pool = None
+bot.storage_task = None
+bot.started_at = None
+bot.ready_logged = False
+bot.metrics = Metrics()
+bot.attendance_reward = ATTENDANCE_REWARD
+# 서비스 계정 하나의 할당량을 모든 시트 요청이 나눠 쓰므로 스케줄러도 하나만 사용
+bot.scheduler = RequestScheduler(
+    rate_per_minute=SHEETS_RATE_PER_MINUTE,
+    burst=SHEETS_BURST,
+    max_retries=SHEETS_MAX_RETRIES,
+    metrics=bot.metrics
+)
+
+def sheet_path(path, sheet_id):
+    """기본이 아닌 스프레드시트의 로컬 파일 경로 (파일 이름에 스프레드시트 ID를 붙여 겹치지 않게 함)"""
+    if not path or sheet_id == GOOGLE_SHEET_ID:
+        return path
+    
+    directory, filename = os.path.split(path)
+    name, dot, ext = filename.partition('.')
+    return os.path.join(directory, f'{name}_{sheet_id}{dot}{ext}')
+
+def create_sheet_manager(sheet_id=None):
+    """환경 변수 설정으로 SheetManager 생성 (sheet_id가 없으면 기본 스프레드시트)"""
+    sheet_id = sheet_id or GOOGLE_SHEET_ID
+    return SheetManager(
+        GOOGLE_CREDENTIALS_FILE,
+        sheet_id,
+        log_batch_size=LOG_BATCH_SIZE,
+        log_flush_interval=LOG_FLUSH_INTERVAL,
+        log_buffer_size=LOG_BUFFER_SIZE,
+        log_rotate_rows=LOG_ROTATE_ROWS,
+        log_rotate_monthly=LOG_ROTATE_MONTHLY,
+        # 기간별 로그 시트 이름(로그_YYYY-MM)이 스프레드시트마다 같으므로 별도 보관 스프레드시트는
+        # 기본 스프레드시트만 쓰고, 서버별 스프레드시트는 자기 스프레드시트 안에 만듦
+        log_archive_sheet_id=LOG_ARCHIVE_SHEET_ID if sheet_id == GOOGLE_SHEET_ID else None,
+        log_archive_dir=sheet_path(LOG_ARCHIVE_DIR, sheet_id),
+        log_keep_periods=LOG_KEEP_PERIODS,
+        write_behind=SHEET_WRITE_BEHIND,
+        journal_file=sheet_path(SHEET_JOURNAL_FILE, sheet_id),
+        flush_interval=SHEET_FLUSH_INTERVAL,
+        coalesce_window=SHEET_COALESCE_WINDOW,
+        item_cache_ttl=ITEM_CACHE_TTL,
+        snapshot_file=sheet_path(SHEET_SNAPSHOT_FILE, sheet_id),
+        snapshot_interval=SHEET_SNAPSHOT_INTERVAL,
+        metrics=bot.metrics,
+        scheduler=bot.scheduler,
+        http_pool_size=SHEETS_HTTP_POOL_SIZE,
+        http_timeout=SHEETS_HTTP_TIMEOUT
+    )
+
+def create_storage(sheet_id=None):
+    """STORAGE_BACKEND 설정에 맞는 저장소 생성 (sheets 또는 sqlite, sheet_id가 없으면 기본 스프레드시트)"""
+    if STORAGE_BACKEND != 'sqlite':
+        return create_sheet_manager(sheet_id)
+    
+    mirror = None
+    if SQLITE_MIRROR_SHEETS and (sheet_id or GOOGLE_SHEET_ID):
+        try:
+            mirror = create_sheet_manager(sheet_id)
+        except Exception as e:
+            # 구글 시트에 연결할 수 없어도 SQLite만으로 동작
+            print(f'[WARNING] 구글 시트 미러 연결 실패, SQLite만 사용합니다: {e}')
+    
+    return SqliteStorage(sheet_path(SQLITE_PATH, sheet_id or GOOGLE_SHEET_ID), mirror=mirror)
+
+def log_phase(name, started):
+    """시작 단계별 소요 시간 출력"""
+    print(f'[STARTUP] {name}: {time.perf_counter() - started:.2f}초')
 
 @bot.event
-async def on_ready():
-    """봇 준비 완료 이벤트"""
-    print('=' * 60)
-    print(f'[BOT] 로그인 성공: {bot.user.name} (ID: {bot.user.id})')
-    print('=' * 60)
+async def setup_hook():
+    """로그인 직후 한 번만 실행 (게이트웨이 재연결 때는 다시 실행되지 않음)"""
+    log_phase('디스코드 로그인', bot.started_at)
+    
+    # 저장소는 연결되기 전에도 만들어 두고 Cog에 넘김 (명령어는 연결될 때까지 잠시 대기)
+    bot.sheet_manager = AsyncSheetManager(max_workers=SHEET_MAX_WORKERS, metrics=bot.metrics)
+    # GUILD_SHEETS_FILE에 등록된 서버는 자기 스프레드시트를 씀 (처음 명령어를 쓸 때 연결)
+    registry = GuildRegistry(GUILD_SHEETS_FILE)
+    bot.storage_pool = StoragePool(
+        registry,
+        bot.sheet_manager,
+        create_storage,
+        default_sheet_id=GOOGLE_SHEET_ID,
+        max_open=GUILD_POOL_SIZE,
+        max_workers=SHEET_MAX_WORKERS,
+        metrics=bot.metrics
+    )
+    if len(registry):
+        print(f'[GUILD] 서버별 스프레드시트 {len(registry)}개 등록 (최대 {GUILD_POOL_SIZE}개 동시 사용)')
+    # 구글 시트 인증/시트 확인은 게이트웨이 접속과 동시에 진행
+    bot.storage_task = asyncio.create_task(connect_storage())
     
+    started = time.perf_counter()
+    await load_cogs()
+    log_phase('Cog 로드', started)
+
+async def connect_storage():
+    """저장소 연결 후 사용자/아이템 캐시를 미리 채움"""
+    started = time.perf_counter()
     try:
-        bot.sheet_manager = SheetManager(GOOGLE_CREDENTIALS_FILE, GOOGLE_SHEET_ID)
-        print('[SHEET] 구글 시트 연결 완료')
+        await bot.sheet_manager.open(create_storage)
     except Exception as e:
-        print(f'[ERROR] 구글 시트 연결 실패: {e}')
+        print(f'[ERROR] 저장소 연결 실패: {e}')
         print('[WARNING] 봇은 실행되지만 데이터 기능이 제한됩니다.')
+        return
+    log_phase(f'저장소 연결 ({STORAGE_BACKEND})', started)
     
-    await load_cogs()
+    started = time.perf_counter()
+    await asyncio.gather(
+        bot.sheet_manager.get_all_users(),
+        bot.sheet_manager.get_catalog_version()
+    )
+    log_phase('캐시 예열', started)
+
+@bot.event
+async def on_ready():
+    """봇 준비 완료 이벤트 (게이트웨이에 다시 연결될 때마다 호출됨)"""
+    if bot.ready_logged:
+        print(f'[BOT] 게이트웨이 재연결: {bot.user.name}')
+        return
+    bot.ready_logged = True
     
+    print('=' * 60)
+    print(f'[BOT] 로그인 성공: {bot.user.name} (ID: {bot.user.id})')
+    if BOT_SHARDED:
+        print(f'[BOT] 샤드 {bot.shard_count}개, 서버 {len(bot.guilds)}개')
+    log_phase('게이트웨이 준비 (시작부터)', bot.started_at)
     print('=' * 60)
     print('[BOT] 준비 완료! 명령어 대기 중...')
     print('=' * 60)
 
+@bot.event
+async def on_shard_ready(shard_id):
+    """샤드 준비 완료 (BOT_SHARDED=1일 때만 호출됨)"""
+    print(f'[BOT] 샤드 {shard_id} 준비 완료')
+
 async def load_cogs():
-    """Cog 파일들 로드"""
+    """Cog 파일들 로드 (이미 로드된 Cog는 건너뜀)"""
     cogs = [
         'cogs.economy_cog',
         'cogs.gambling_cog',
@@ -55,12 +219,61 @@ async def load_cogs():
     ]
     
     for cog in cogs:
+        if cog in bot.extensions:
+            continue
         try:
             await bot.load_extension(cog)
             print(f'[COG] {cog} 로드 완료')
         except Exception as e:
             print(f'[ERROR] {cog} 로드 실패: {e}')
 
+async def show_typing(ctx):
+    """TYPING_DELAY초 넘게 걸리는 명령어에 입력 중 표시 (명령어가 끝나면 취소됨)"""
+    await asyncio.sleep(TYPING_DELAY)
+    async with ctx.typing():
+        await asyncio.Event().wait()
+
+def finish_command(ctx, failed):
+    """명령어 처리 시간 기록, 입력 중 표시 중지, 저장소 반납 (한 번만 실행)"""
+    # 슬래시 명령어는 본문에서 오류가 나면 after_invoke가 불리지 않으므로 on_command_error에서도 부름
+    if getattr(ctx, 'metrics_started', None) is None:
+        return
+    
+    bot.metrics.record_command(
+        ctx.command.qualified_name,
+        time.perf_counter() - ctx.metrics_started,
+        failed=failed
+    )
+    ctx.metrics_started = None
+    if ctx.typing_task is not None:
+        ctx.typing_task.cancel()
+    if ctx.sheet is not None:
+        bot.storage_pool.release(ctx.sheet)
+
+@bot.before_invoke
+async def before_command(ctx):
+    """명령어 시작 시각 기록 (이 명령어가 보내는 시트 요청도 명령어 이름으로 집계)"""
+    ctx.metrics_token = current_command.set(ctx.command.qualified_name)
+    ctx.metrics_started = time.perf_counter()
+    ctx.typing_task = None
+    if ctx.interaction is not None:
+        # 슬래시 명령어는 3초 안에 응답해야 하므로 바로 응답을 미루고 ('생각 중...' 표시) 결과는 나중에 보냄
+        await ctx.defer()
+    else:
+        ctx.typing_task = asyncio.create_task(show_typing(ctx))
+    # 이 서버의 저장소 (@uses_storage로 표시한 명령어만, 나머지는 저장소를 열거나 기다리지 않음)
+    ctx.sheet = None
+    if getattr(ctx.command.callback, 'uses_storage', False):
+        ctx.sheet = bot.storage_pool.acquire(ctx.guild)
+        # 시작 직후나 서버 저장소를 처음 열 때 아직 연결 중이면 실패하지 않고 잠시 기다림
+        await ctx.sheet.wait_ready(STARTUP_WAIT_SECONDS)
+
+@bot.after_invoke
+async def after_command(ctx):
+    """명령어 처리 시간과 성공 여부 기록"""
+    finish_command(ctx, ctx.command_failed)
+    current_command.reset(ctx.metrics_token)
+
 @bot.event
 async def on_message(message):
     """메시지 수신 이벤트"""
@@ -77,18 +290,23 @@ async def help_command(ctx, category: str = None):
         msg += '카테고리:\n'
         msg += '!도움말 경제 - 갈레온, 구매, 양도 등\n'
         msg += '!도움말 도박 - 베팅\n'
-        msg += '!도움말 재미 - 타로, 주사위, 동전, 운세\n'
+        msg += '!도움말 재미 - 타로, 주사위, 동전, 운세\n\n'
+        msg += '경제/도박/재미 명령어는 /주머니처럼 슬래시 명령어로도 쓸 수 있습니다.\n'
         
         await ctx.send(msg)
     
     elif category in ['경제', 'economy']:
         msg = '**경제 명령어**\n\n'
         msg += '!등록 <이름> - 게임에 등록 (초기 갈레온 100개)\n'
+        msg += f'!출석 - 하루 한 번 출석하고 {bot.attendance_reward}G 받기\n'
         msg += '!주머니 [@사용자] - 소지품 확인\n'
         msg += '!상점 - 판매 중인 아이템 목록\n'
         msg += '!구매 <아이템명> - 아이템 구매\n'
         msg += '!사용 <아이템명> - 아이템 사용\n'
         msg += '!양도 @사용자 <갈레온|아이템> - 갈레온 또는 아이템 양도\n'
+        msg += '!순위 [인원] - 갈레온 순위와 내 순위\n'
+        msg += '!기숙사순위 - 기숙사별 점수 합계 순위\n'
+        msg += '!기록 [@사용자] - 최근 거래 기록 (기본 본인)\n'
         
         await ctx.send(msg)
     
@@ -127,29 +345,243 @@ async def reload_cogs(ctx):
     
     await ctx.send(f'{len(cogs)}개 Cog 재로드 완료')
 
+@bot.command(name='슬래시동기화', aliases=['sync'])
+@commands.has_permissions(administrator=True)
+async def sync_commands(ctx, scope: str = None):
+    """슬래시 명령어 등록 (관리자 전용, !sync 서버 = 이 서버에만 바로 반영)"""
+    # 전체 등록은 디스코드에 반영되기까지 시간이 걸릴 수 있으므로 시험할 때는 서버 단위로 등록
+    if scope in ['서버', 'guild'] and ctx.guild is not None:
+        bot.tree.copy_global_to(guild=ctx.guild)
+        synced = await bot.tree.sync(guild=ctx.guild)
+        await ctx.send(f'이 서버에 슬래시 명령어 {len(synced)}개를 등록했습니다.')
+    else:
+        synced = await bot.tree.sync()
+        await ctx.send(f'슬래시 명령어 {len(synced)}개를 등록했습니다. 모든 서버에 반영되기까지 시간이 걸릴 수 있습니다.')
+
+@bot.command(name='새로고침', aliases=['refresh'])
+@commands.has_permissions(administrator=True)
+@uses_storage
+async def refresh_cache(ctx, member: typing.Optional[discord.Member] = None, target: str = None):
+    """시트를 직접 수정한 뒤 캐시를 다시 읽음 (관리자 전용)"""
+    if not ctx.sheet.connected:
+        await ctx.send('구글 시트가 연결되지 않았습니다.')
+        return
+    
+    if member:
+        if await ctx.sheet.invalidate_users(str(member.id)):
+            await ctx.send(f'{member.mention}님의 정보를 다시 불러왔습니다.')
+        else:
+            await ctx.send(f'{member.mention}님의 정보를 불러오지 못했습니다.')
+    elif target in ['아이템', 'items']:
+        if await ctx.sheet.reload_items():
+            await ctx.send('아이템 목록을 다시 불러왔습니다.')
+        else:
+            await ctx.send('아이템 목록을 불러오지 못했습니다.')
+    elif target in ['사용자', 'users']:
+        if await ctx.sheet.invalidate_users():
+            await ctx.send('사용자 캐시를 비웠습니다. 다음 명령어에서 시트를 다시 읽습니다.')
+        else:
+            await ctx.send('사용자 정보를 불러오지 못했습니다.')
+    else:
+        users_ok = await ctx.sheet.invalidate_users()
+        items_ok = await ctx.sheet.reload_items()
+        if users_ok and items_ok:
+            await ctx.send('사용자 캐시를 비우고 아이템 목록을 다시 불러왔습니다.')
+        else:
+            failed = [name for name, ok in (('사용자 정보', users_ok), ('아이템 목록', items_ok)) if not ok]
+            await ctx.send(f"{', '.join(failed)}을(를) 불러오지 못했습니다.")
+
+@bot.command(name='아이템변환', aliases=['migrateitems'])
+@commands.has_permissions(administrator=True)
+@uses_storage
+async def migrate_items(ctx):
+    """사용자 아이템 칸을 "이름:개수" 형식으로 일괄 변환 (관리자 전용)"""
+    if not ctx.sheet.connected:
+        await ctx.send('구글 시트가 연결되지 않았습니다.')
+        return
+    
+    migrated = await ctx.sheet.migrate_inventories()
+    
+    if migrated is None:
+        await ctx.send('아이템 칸 변환 중 오류가 발생했습니다.')
+    else:
+        await ctx.send(f'{migrated}명의 아이템 칸을 변환했습니다.')
+
 @bot.command(name='갈레온지급', aliases=['addgalleons'])
 @commands.has_permissions(administrator=True)
+@uses_storage
 async def add_galleons(ctx, member: discord.Member, amount: int):
     """특정 사용자에게 갈레온 지급 (관리자 전용)"""
-    if bot.sheet_manager is None:
+    if not ctx.sheet.connected:
         await ctx.send('구글 시트가 연결되지 않았습니다.')
         return
     
     user_id = str(member.id)
-    user = bot.sheet_manager.find_user(user_id)
     
-    if not user:
-        await ctx.send(f'{member.mention}님은 등록되지 않았습니다.')
-        return
+    async with ctx.sheet.transaction(user_id) as tx:
+        user = tx.user(user_id)
+        if not user:
+            await ctx.send(f'{member.mention}님은 등록되지 않았습니다.')
+            return
+        
+        tx.add_galleons(user_id, amount)
+        new_galleons = user['galleons']
     
-    new_galleons = user['galleons'] + amount
-    bot.sheet_manager.update_user(user_id, {'galleons': new_galleons})
+    if not tx.committed:
+        await ctx.send('갈레온 지급 중 오류가 발생했습니다.')
+        return
     
     await ctx.send(f'{member.mention}님에게 {amount}G 지급 완료 (현재: {new_galleons}G)')
 
+def resolve_grant_targets(ctx, target, users):
+    """일괄 지급 대상 해석 → (대상 사용자 목록, 대상 설명, 등록되지 않은 멤버 목록)"""
+    # 전체 / 기숙사 <이름> / @멤버·@역할 멘션 여러 개 / 역할 이름
+    users_by_id = {str(user['id']).strip(): user for user in users}
+    words = target.split(maxsplit=1)
+    
+    if target in ['전체', 'all']:
+        return users, '전체', []
+    
+    if words[0] in ['기숙사', 'house'] and len(words) == 2:
+        house = words[1].strip()
+        return [user for user in users if str(user['house']).strip() == house], f'{house} 기숙사', []
+    
+    members = {member.id: member for member in ctx.message.mentions}
+    roles = list(ctx.message.role_mentions)
+    if not members and not roles and ctx.guild is not None:
+        role = discord.utils.get(ctx.guild.roles, name=target.strip())
+        if role is None:
+            # 같은 이름의 역할이 없으면 기숙사 이름으로 봄
+            return resolve_grant_targets(ctx, f'기숙사 {target}', users)
+        roles.append(role)
+    for role in roles:
+        for member in role.members:
+            members[member.id] = member
+    
+    targets = []
+    unregistered = []
+    for member in members.values():
+        user = users_by_id.get(str(member.id))
+        if user:
+            targets.append(user)
+        elif not member.bot:
+            unregistered.append(member.display_name)
+    
+    labels = [f'@{role.name}' for role in roles] + [member.display_name for member in ctx.message.mentions]
+    return targets, ', '.join(labels), unregistered
+
+@bot.command(name='일괄지급', aliases=['bulkgrant'])
+@commands.has_permissions(administrator=True)
+@uses_storage
+async def bulk_grant(ctx, amount: int, *, target: str):
+    """여러 사용자에게 갈레온 일괄 지급 (관리자 전용, 시트 읽기/쓰기 각 1회)"""
+    if not ctx.sheet.connected:
+        await ctx.send('구글 시트가 연결되지 않았습니다.')
+        return
+    
+    if amount == 0:
+        await ctx.send('0이 아닌 금액을 입력하세요.')
+        return
+    
+    users = await ctx.sheet.get_all_users()
+    targets, label, unregistered = resolve_grant_targets(ctx, target, users)
+    
+    if not targets:
+        msg = '지급할 등록 사용자가 없습니다.'
+        if unregistered:
+            msg += f' (미등록: {", ".join(unregistered)})'
+        await ctx.send(msg)
+        return
+    
+    # 모든 변경을 트랜잭션 하나로 모아 batch_update 한 번으로 기록
+    results = []
+    async with ctx.sheet.transaction(*[user['id'] for user in targets]) as tx:
+        for target_user in targets:
+            user = tx.user(target_user['id'])
+            if not user:
+                continue
+            before = user['galleons']
+            tx.add_galleons(user['id'], amount)
+            results.append((user['name'], before, user['galleons']))
+    
+    if not tx.committed:
+        await ctx.send('일괄 지급 중 오류가 발생했습니다.')
+        return
+    
+    await ctx.sheet.log_message(
+        user=ctx.author.name,
+        command='일괄지급',
+        content=f'{label} {len(results)}명에게 {amount}G'
+    )
+    
+    lines = [f'**{label} {len(results)}명에게 {amount}G 지급 완료**', '']
+    lines += [f'{name}: {before}G → {after}G' for name, before, after in results]
+    if unregistered:
+        lines += ['', f'미등록 (지급 안 함): {", ".join(unregistered)}']
+    
+    # 디스코드 메시지 길이 제한(2000자)에 맞춰 나눠 보냄
+    msg = ''
+    for line in lines:
+        if len(msg) + len(line) + 1 > 2000:
+            await ctx.send(msg)
+            msg = ''
+        msg += line + '\n'
+    await ctx.send(msg)
+
+@bot.command(name='stats', aliases=['통계'])
+@commands.has_permissions(administrator=True)
+async def stats(ctx, action: str = None):
+    """명령어/저장소 처리 시간과 시트 요청 수 (관리자 전용, !stats 초기화로 리셋)"""
+    if action in ['초기화', 'reset']:
+        bot.metrics.reset()
+        await ctx.send('통계를 초기화했습니다.')
+        return
+    
+    snapshot = bot.metrics.snapshot()
+    minutes = int(snapshot['uptime'] // 60)
+    
+    msg = f'**봇 통계** (집계 시간: {minutes // 60}시간 {minutes % 60}분)\n```\n'
+    msg += f'{"명령어":<12}{"횟수":>6}{"오류":>5}{"p50":>8}{"p95":>8}{"API/회":>8}\n'
+    commands_by_count = sorted(snapshot['commands'].items(), key=lambda kv: -kv[1]['count'])
+    for name, row in commands_by_count[:10]:
+        if not row['count']:
+            continue
+        msg += (f'{name[:12]:<12}{row["count"]:>6}{row["errors"]:>5}'
+                f'{row["p50"]:>7.2f}s{row["p95"]:>7.2f}s{row["api_calls"] / row["count"]:>8.1f}\n')
+    
+    background = sum(row['api_calls'] for row in snapshot['commands'].values() if not row['count'])
+    api_errors = sum(row['api_errors'] for row in snapshot['commands'].values())
+    total_api = sum(row['api_calls'] for row in snapshot['commands'].values())
+    msg += f'\n시트 요청: 총 {total_api}회 (백그라운드 {background}회, 실패 {api_errors}회)\n'
+    
+    waits = ' / '.join(
+        f'{name} {row["p95"]:.2f}s'
+        for name, row in sorted(snapshot['queue_waits'].items())
+    ) or '없음'
+    retries = snapshot['retries']
+    msg += (f'시트 대기열: 현재 {bot.scheduler.queue_depth()}개 (최대 {bot.scheduler.max_queue_depth}개), '
+            f'대기 p95 {waits}\n')
+    msg += f'재시도: {sum(retries.values())}회 (할당량 초과 {retries.get(429, 0)}회)\n\n'
+    
+    msg += f'{"저장소":<22}{"횟수":>6}{"오류":>5}{"p50":>8}{"p95":>8}\n'
+    storage_by_count = sorted(snapshot['storage'].items(), key=lambda kv: -kv[1]['count'])
+    for name, row in storage_by_count[:10]:
+        msg += (f'{name[:22]:<22}{row["count"]:>6}{row["errors"]:>5}'
+                f'{row["p50"]:>7.2f}s{row["p95"]:>7.2f}s\n')
+    msg += '```'
+    
+    await ctx.send(msg)
+
 @bot.event
 async def on_command_error(ctx, error):
     """명령어 에러 처리"""
+    finish_command(ctx, True)
+    
+    # 슬래시 명령어는 HybridCommandError(app_commands.CommandInvokeError(원래 예외))처럼
+    # 두 번 감싸져 오므로 원래 예외까지 풀어서 판단
+    while getattr(error, 'original', None) is not None:
+        error = error.original
+    
     if isinstance(error, commands.MissingRequiredArgument):
         await ctx.send('필수 인자가 누락되었습니다. !도움말을 참고하세요.')
     elif isinstance(error, commands.MissingPermissions):
@@ -158,14 +590,32 @@ async def on_command_error(ctx, error):
         pass
     elif isinstance(error, commands.BadArgument):
         await ctx.send('잘못된 인자입니다. 사용법을 확인하세요.')
+    elif isinstance(error, StorageUnavailable):
+        await ctx.send('저장소가 아직 준비되지 않았습니다. 잠시 후 다시 시도하세요.')
     else:
         print(f'[ERROR] {error}')
         await ctx.send(f'오류가 발생했습니다: {error}')
 
 async def main():
     """비동기 메인 함수"""
+    metrics_runner = None
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(bot.metrics, METRICS_HOST, int(METRICS_PORT))
+    
     async with bot:
-        await bot.start(DISCORD_TOKEN)
+        try:
+            bot.started_at = time.perf_counter()
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            if bot.storage_task is not None and not bot.storage_task.done():
+                # 연결 중에 종료하면 연결이 끝난 뒤 남은 기록을 정리
+                await asyncio.gather(bot.storage_task, return_exceptions=True)
+            if bot.storage_pool is not None:
+                await bot.storage_pool.close()
+            if bot.sheet_manager is not None:
+                await bot.sheet_manager.close()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
 
 if __name__ == '__main__':
     if not DISCORD_TOKEN:
@@ -173,7 +623,7 @@ if __name__ == '__main__':
         print('       .env 파일을 확인하세요.')
         exit(1)
     
-    if not GOOGLE_SHEET_ID:
+    if not GOOGLE_SHEET_ID and STORAGE_BACKEND != 'sqlite':
         print('[ERROR] GOOGLE_SHEET_ID가 설정되지 않았습니다.')
         print('       .env 파일을 확인하세요.')
         exit(1)
@@ -2,42 +2,116 @@
 # 경제 관련 명령어
 
 import discord
+from discord import app_commands
 from discord.ext import commands
+from datetime import datetime
+import pytz
+import weakref
+from guild_storage import uses_storage
 
 class EconomyCog(commands.Cog, name="경제"):
     """갈레온 및 아이템 관리"""
     
-    def __init__(self, bot, sheet_manager):
+    # 저장소는 명령어마다 ctx.sheet (서버에 연결된 스프레드시트, @uses_storage로 표시하면 bot.before_invoke에서 지정)
+    
+    MAX_MESSAGE_LENGTH = 2000
+    ATTENDANCE_REWARD = 50
+    
+    def __init__(self, bot, attendance_reward=ATTENDANCE_REWARD):
         self.bot = bot
-        self.sheet = sheet_manager
+        self.attendance_reward = attendance_reward
+        # 저장소 → (아이템 목록 버전, 상점 페이지), 버전별로 상점 페이지를 한 번만 생성
+        self._shop_pages = weakref.WeakKeyDictionary()
+    
+    def _render_shop_pages(self, items):
+        """상점 목록을 메시지 길이 제한에 맞춰 페이지로 나눔"""
+        pages = []
+        msg = '**상점 아이템 목록**\n\n'
+        
+        for item in items:
+            desc = item['description'][:100] if item['description'] else '신비한 물건...'
+            entry = f'{item["name"]} - {item["price"]}G\n{desc}\n\n'
+            
+            if len(msg) + len(entry) > self.MAX_MESSAGE_LENGTH:
+                pages.append(msg)
+                msg = ''
+            msg += entry
+        
+        pages.append(msg)
+        return pages
     
-    @commands.command(name='등록', aliases=['register'])
+    @commands.hybrid_command(name='등록', aliases=['register'])
+    @app_commands.describe(name='게임에서 쓸 이름 (비우면 디스코드 이름)')
+    @uses_storage
     async def register(self, ctx, *, name: str = None):
         """게임에 등록합니다."""
         user_id = str(ctx.author.id)
         
-        existing = self.sheet.find_user(user_id)
-        if existing:
-            await ctx.send(f'이미 등록되어 있습니다. (이름: {existing["name"]})')
-            return
-        
-        if not name:
-            name = ctx.author.name
-        
-        success = self.sheet.create_user(user_id, name, initial_galleons=100)
+        # 같은 사용자의 중복 등록을 막기 위해 사용자 잠금 안에서 확인 후 생성
+        async with ctx.sheet.transaction(user_id) as tx:
+            existing = tx.user(user_id)
+            if existing:
+                await ctx.send(f'이미 등록되어 있습니다. (이름: {existing["name"]})')
+                return
+            
+            if not name:
+                name = ctx.author.name
+            
+            success = await ctx.sheet.create_user(user_id, name, initial_galleons=100)
         
         if success:
             await ctx.send(f'{name}님 등록 완료! 초기 갈레온 100개가 지급되었습니다.')
         else:
             await ctx.send('등록 중 오류가 발생했습니다.')
     
-    @commands.command(name='주머니', aliases=['pouch', '가방'])
+    @commands.hybrid_command(name='출석', aliases=['attendance', 'checkin'])
+    @uses_storage
+    async def attendance(self, ctx):
+        """오늘 출석하고 갈레온을 받습니다. (하루 1번)"""
+        user_id = str(ctx.author.id)
+        
+        kst = pytz.timezone('Asia/Seoul')
+        today = datetime.now(kst).strftime('%Y-%m-%d')
+        
+        # 자정 직후 출석이 몰려도 시트 요청이 늘지 않도록
+        # 캐시에서 확인/반영하고 시트에는 짧은 시간 동안 모아서 한 번에 기록
+        async with ctx.sheet.transaction(user_id, deferred=True) as tx:
+            user = tx.user(user_id)
+            if not user:
+                await ctx.send('먼저 !등록 명령어로 등록하세요.')
+                return
+            
+            if user['attendance_date'] == today:
+                await ctx.send('오늘은 이미 출석했습니다. 내일 다시 시도하세요.')
+                return
+            
+            new_galleons = user['galleons'] + self.attendance_reward
+            tx.update(user_id, {
+                'galleons': new_galleons,
+                'attendance_date': today
+            })
+        
+        if not tx.committed:
+            await ctx.send('출석 처리 중 오류가 발생했습니다.')
+            return
+        
+        await ctx.sheet.log_message(
+            user=ctx.author.name,
+            command='출석',
+            content=f'+{self.attendance_reward}G'
+        )
+        
+        await ctx.send(f'{ctx.author.mention}님 출석 완료! {self.attendance_reward}G 지급 (현재: {new_galleons}G)')
+    
+    @commands.hybrid_command(name='주머니', aliases=['pouch', '가방'])
+    @app_commands.describe(member='소지품을 볼 사용자 (비우면 본인)')
+    @uses_storage
     async def pouch(self, ctx, member: discord.Member = None):
         """소지품을 확인합니다."""
         target = member if member else ctx.author
         user_id = str(target.id)
         
-        user = self.sheet.find_user(user_id)
+        user = await ctx.sheet.find_user(user_id)
         if not user:
             if target == ctx.author:
                 await ctx.send('아직 등록되지 않았습니다. !등록 명령어를 사용하세요.')
@@ -45,7 +119,7 @@ class EconomyCog(commands.Cog, name="경제"):
                 await ctx.send(f'{target.mention}님은 등록되지 않았습니다.')
             return
         
-        items_dict = self.sheet.get_user_items(user_id)
+        items_dict = await ctx.sheet.get_user_items(user_id)
         
         if items_dict:
             items_text = '\n'.join([
@@ -61,54 +135,65 @@ class EconomyCog(commands.Cog, name="경제"):
         
         await ctx.send(msg)
     
-    @commands.command(name='상점', aliases=['shop', 'store'])
+    @commands.hybrid_command(name='상점', aliases=['shop', 'store'])
+    @uses_storage
     async def shop(self, ctx):
         """상점 아이템 목록을 봅니다."""
-        items = self.sheet.get_all_items(sellable_only=True)
+        version = await ctx.sheet.get_catalog_version()
+        
+        cached = self._shop_pages.get(ctx.sheet)
+        if cached is None or cached[0] != version:
+            items = await ctx.sheet.get_all_items(sellable_only=True)
+            cached = (version, self._render_shop_pages(items) if items else [])
+            self._shop_pages[ctx.sheet] = cached
         
-        if not items:
+        pages = cached[1]
+        if not pages:
             await ctx.send('현재 판매 중인 아이템이 없습니다.')
             return
         
-        msg = '**상점 아이템 목록**\n\n'
-        for item in items:
-            desc = item['description'][:100] if item['description'] else '신비한 물건...'
-            msg += f'{item["name"]} - {item["price"]}G\n{desc}\n\n'
-        
-        await ctx.send(msg)
+        for page in pages:
+            await ctx.send(page)
     
-    @commands.command(name='구매', aliases=['buy'])
+    @commands.hybrid_command(name='구매', aliases=['buy'])
+    @app_commands.describe(item_name='구매할 아이템 이름')
+    @uses_storage
     async def buy(self, ctx, *, item_name: str):
         """아이템을 구매합니다."""
         user_id = str(ctx.author.id)
         
-        user = self.sheet.find_user(user_id)
-        if not user:
-            await ctx.send('먼저 !등록 명령어로 등록하세요.')
-            return
-        
-        if user['galleons'] < 0:
-            await ctx.send('빚을 갚기 전까지는 물건을 살 수 없습니다.')
-            return
-        
-        item = self.sheet.find_item(item_name)
-        if not item:
-            await ctx.send(f'"{item_name}"은(는) 상점에 없는 물건입니다.')
-            return
-        
-        if not item['sellable']:
-            await ctx.send(f'"{item_name}"은(는) 현재 판매하지 않습니다.')
-            return
+        async with ctx.sheet.transaction(user_id) as tx:
+            user = tx.user(user_id)
+            if not user:
+                await ctx.send('먼저 !등록 명령어로 등록하세요.')
+                return
+            
+            if user['galleons'] < 0:
+                await ctx.send('빚을 갚기 전까지는 물건을 살 수 없습니다.')
+                return
+            
+            item = await ctx.sheet.find_item(item_name)
+            if not item:
+                await ctx.send(f'"{item_name}"은(는) 상점에 없는 물건입니다.')
+                return
+            
+            if not item['sellable']:
+                await ctx.send(f'"{item_name}"은(는) 현재 판매하지 않습니다.')
+                return
+            
+            if user['galleons'] < item['price']:
+                await ctx.send(f'갈레온이 부족합니다. (필요: {item["price"]}G, 보유: {user["galleons"]}G)')
+                return
+            
+            tx.add_galleons(user_id, -item['price'])
+            tx.add_item(user_id, item_name)
+            new_galleons = user['galleons']
         
-        if user['galleons'] < item['price']:
-            await ctx.send(f'갈레온이 부족합니다. (필요: {item["price"]}G, 보유: {user["galleons"]}G)')
+        if not tx.committed:
+            await ctx.send('구매 중 오류가 발생했습니다.')
             return
         
-        new_galleons = user['galleons'] - item['price']
-        self.sheet.update_user(user_id, {'galleons': new_galleons})
-        self.sheet.add_item_to_user(user_id, item_name)
-        
-        self.sheet.log_message(
+        await ctx.sheet.log_message(
             user=ctx.author.name,
             command='구매',
             content=f'{item_name} - {item["price"]}G'
@@ -116,33 +201,39 @@ class EconomyCog(commands.Cog, name="경제"):
         
         await ctx.send(f'{item_name} 구매 완료! 남은 갈레온: {new_galleons}G')
     
-    @commands.command(name='사용', aliases=['use'])
+    @commands.hybrid_command(name='사용', aliases=['use'])
+    @app_commands.describe(item_name='사용할 아이템 이름')
+    @uses_storage
     async def use_item(self, ctx, *, item_name: str):
         """아이템을 사용합니다."""
         user_id = str(ctx.author.id)
         
-        user = self.sheet.find_user(user_id)
-        if not user:
-            await ctx.send('먼저 !등록 명령어로 등록하세요.')
-            return
-        
-        items_dict = self.sheet.get_user_items(user_id)
-        if item_name not in items_dict:
-            await ctx.send(f'"{item_name}"을(를) 가지고 있지 않습니다.')
-            return
-        
-        item = self.sheet.find_item(item_name)
-        if not item:
-            await ctx.send('아이템 정보를 찾을 수 없습니다.')
-            return
+        async with ctx.sheet.transaction(user_id) as tx:
+            user = tx.user(user_id)
+            if not user:
+                await ctx.send('먼저 !등록 명령어로 등록하세요.')
+                return
+            
+            if item_name not in user['inventory']:
+                await ctx.send(f'"{item_name}"을(를) 가지고 있지 않습니다.')
+                return
+            
+            item = await ctx.sheet.find_item(item_name)
+            if not item:
+                await ctx.send('아이템 정보를 찾을 수 없습니다.')
+                return
+            
+            if not item['usable']:
+                await ctx.send(f'"{item_name}"은(는) 사용할 수 없는 아이템입니다.')
+                return
+            
+            tx.remove_item(user_id, item_name)
         
-        if not item['usable']:
-            await ctx.send(f'"{item_name}"은(는) 사용할 수 없는 아이템입니다.')
+        if not tx.committed:
+            await ctx.send('아이템 사용 중 오류가 발생했습니다.')
             return
         
-        self.sheet.remove_item_from_user(user_id, item_name)
-        
-        self.sheet.log_message(
+        await ctx.sheet.log_message(
             user=ctx.author.name,
             command='사용',
             content=item_name
@@ -160,7 +251,9 @@ class EconomyCog(commands.Cog, name="경제"):
         
         await ctx.send(msg)
     
-    @commands.command(name='양도', aliases=['give', 'transfer'])
+    @commands.hybrid_command(name='양도', aliases=['give', 'transfer'])
+    @app_commands.describe(member='받을 사용자', amount_or_item='갈레온 수 또는 아이템 이름')
+    @uses_storage
     async def transfer(self, ctx, member: discord.Member, amount_or_item: str):
         """갈레온 또는 아이템을 양도합니다."""
         sender_id = str(ctx.author.id)
@@ -170,62 +263,119 @@ class EconomyCog(commands.Cog, name="경제"):
             await ctx.send('자기 자신에게는 양도할 수 없습니다.')
             return
         
-        sender = self.sheet.find_user(sender_id)
-        if not sender:
-            await ctx.send('먼저 !등록 명령어로 등록하세요.')
-            return
-        
-        if sender['galleons'] < 0:
-            await ctx.send('빚이 있는 상태에서는 양도할 수 없습니다.')
-            return
-        
-        receiver = self.sheet.find_user(receiver_id)
-        if not receiver:
-            await ctx.send(f'{member.mention}님은 아직 등록되지 않았습니다.')
-            return
-        
-        if amount_or_item.isdigit():
-            amount = int(amount_or_item)
-            
-            if amount <= 0:
-                await ctx.send('1 이상의 갈레온만 양도할 수 있습니다.')
+        async with ctx.sheet.transaction(sender_id, receiver_id) as tx:
+            sender = tx.user(sender_id)
+            if not sender:
+                await ctx.send('먼저 !등록 명령어로 등록하세요.')
                 return
             
-            if sender['galleons'] < amount:
-                await ctx.send(f'갈레온이 부족합니다. (보유: {sender["galleons"]}G)')
+            if sender['galleons'] < 0:
+                await ctx.send('빚이 있는 상태에서는 양도할 수 없습니다.')
                 return
             
-            self.sheet.update_user(sender_id, {'galleons': sender['galleons'] - amount})
-            self.sheet.update_user(receiver_id, {'galleons': receiver['galleons'] + amount})
-            
-            self.sheet.log_message(
-                user=ctx.author.name,
-                command='양도',
-                content=f'{amount}G → {member.name}'
-            )
-            
-            await ctx.send(f'{member.mention}님에게 {amount}G를 양도했습니다.')
-        
-        else:
-            item_name = amount_or_item
-            items_dict = self.sheet.get_user_items(sender_id)
-            
-            if item_name not in items_dict:
-                await ctx.send(f'"{item_name}"을(를) 가지고 있지 않습니다.')
+            receiver = tx.user(receiver_id)
+            if not receiver:
+                await ctx.send(f'{member.mention}님은 아직 등록되지 않았습니다.')
                 return
             
-            self.sheet.remove_item_from_user(sender_id, item_name)
-            self.sheet.add_item_to_user(receiver_id, item_name)
+            if amount_or_item.isdigit():
+                amount = int(amount_or_item)
+                
+                if amount <= 0:
+                    await ctx.send('1 이상의 갈레온만 양도할 수 있습니다.')
+                    return
+                
+                if sender['galleons'] < amount:
+                    await ctx.send(f'갈레온이 부족합니다. (보유: {sender["galleons"]}G)')
+                    return
+                
+                tx.add_galleons(sender_id, -amount)
+                tx.add_galleons(receiver_id, amount)
+                
+                content = f'{amount}G → {member.name}'
+                reply = f'{member.mention}님에게 {amount}G를 양도했습니다.'
             
-            self.sheet.log_message(
-                user=ctx.author.name,
-                command='양도',
-                content=f'{item_name} → {member.name}'
-            )
-            
-            await ctx.send(f'{member.mention}님에게 {item_name}을(를) 양도했습니다.')
+            else:
+                item_name = amount_or_item
+                
+                if not tx.remove_item(sender_id, item_name):
+                    await ctx.send(f'"{item_name}"을(를) 가지고 있지 않습니다.')
+                    return
+                
+                tx.add_item(receiver_id, item_name)
+                
+                content = f'{item_name} → {member.name}'
+                reply = f'{member.mention}님에게 {item_name}을(를) 양도했습니다.'
+        
+        if not tx.committed:
+            await ctx.send('양도 중 오류가 발생했습니다.')
+            return
+        
+        await ctx.sheet.log_message(
+            user=ctx.author.name,
+            command='양도',
+            content=content
+        )
+        
+        await ctx.send(reply)
+    
+    @commands.hybrid_command(name='순위', aliases=['ranking', 'rank', 'leaderboard'])
+    @app_commands.describe(limit='표시할 인원 (기본 10명)')
+    @uses_storage
+    async def ranking(self, ctx, limit: int = 10):
+        """갈레온 순위를 봅니다. (기본 상위 10명, 최대 30명)"""
+        limit = max(1, min(limit, 30))
+        top_users = await ctx.sheet.get_top_users(limit)
+        
+        if not top_users:
+            await ctx.send('아직 등록된 사용자가 없습니다.')
+            return
+        
+        msg = '**갈레온 순위**\n\n'
+        for entry in top_users:
+            msg += f'{entry["rank"]}위 {entry["name"]} - {entry["galleons"]}G\n'
+        
+        my_rank = await ctx.sheet.get_user_rank(str(ctx.author.id))
+        if my_rank:
+            msg += f'\n내 순위: {my_rank["rank"]}위 / {my_rank["total"]}명 ({my_rank["galleons"]}G)'
+        
+        await ctx.send(msg)
+    
+    @commands.hybrid_command(name='기숙사순위', aliases=['houserank', 'houses'])
+    @uses_storage
+    async def house_ranking(self, ctx):
+        """기숙사별 점수 합계 순위를 봅니다."""
+        houses = await ctx.sheet.get_house_ranking()
+        
+        if not houses:
+            await ctx.send('기숙사가 배정된 사용자가 없습니다.')
+            return
+        
+        msg = '**기숙사 순위**\n\n'
+        for entry in houses:
+            msg += f'{entry["rank"]}위 {entry["house"]} - {entry["score"]}점 ({entry["members"]}명, {entry["galleons"]}G)\n'
+        
+        await ctx.send(msg)
+    
+    @commands.hybrid_command(name='기록', aliases=['history', 'logs'])
+    @app_commands.describe(member='기록을 볼 사용자 (비우면 본인)')
+    @uses_storage
+    async def history(self, ctx, member: discord.Member = None):
+        """최근 거래 기록을 봅니다. (기본 본인, 최근 10개)"""
+        target = member if member else ctx.author
+        logs = await ctx.sheet.get_user_logs(target.name, 10)
+        
+        if not logs:
+            await ctx.send(f'{target.name}님의 기록이 없습니다.')
+            return
+        
+        msg = f'**{target.name}의 최근 기록**\n\n'
+        for log in logs:
+            msg += f'{log["타임스탬프"]} [{log["명령어"]}] {log["내용"]}\n'
+        
+        await ctx.send(msg[:self.MAX_MESSAGE_LENGTH])
 
 async def setup(bot):
     """Cog 로드"""
-    sheet_manager = bot.sheet_manager
-    await bot.add_cog(EconomyCog(bot, sheet_manager))
+    attendance_reward = getattr(bot, 'attendance_reward', EconomyCog.ATTENDANCE_REWARD)
+    await bot.add_cog(EconomyCog(bot, attendance_reward=attendance_reward))
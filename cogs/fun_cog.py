@@ -2,10 +2,12 @@
 # 재미 기능 (타로, 주사위, 동전, YN, 운세)
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 import random
 from datetime import datetime
 import pytz
+from guild_storage import uses_storage
 
 class FunCog(commands.Cog, name="재미"):
     """타로, 주사위 등 재미 명령어"""
@@ -110,11 +112,11 @@ class FunCog(commands.Cog, name="재미"):
         "작은 수정구", "포션 샘플 병", "행운의 깃털 장식"
     ]
     
-    def __init__(self, bot, sheet_manager):
+    def __init__(self, bot):
         self.bot = bot
-        self.sheet = sheet_manager
     
-    @commands.command(name='타로', aliases=['tarot'])
+    @commands.hybrid_command(name='타로', aliases=['tarot'])
+    @uses_storage
     async def tarot(self, ctx):
         """타로 카드를 뽑습니다. (78장 풀덱)"""
         card_name, message = random.choice(list(self.TAROT_DATA.items()))
@@ -123,27 +125,29 @@ class FunCog(commands.Cog, name="재미"):
         place = random.choice(self.PLACES)
         item = random.choice(self.ITEMS)
         
+        msg = f'**{card_name}**\n\n'
+        msg += f'{message}\n\n'
+        msg += f'추천 색: {color}\n'
+        msg += f'추천 장소: {place}\n'
+        msg += f'추천 물건: {item}'
+        
+        await ctx.send(msg)
+        
+        # 타로 날짜는 캐시에만 바로 반영되고 시트 기록은 백그라운드에서 모아서 나감
         user_id = str(ctx.author.id)
-        user = self.sheet.find_user(user_id)
+        user = await ctx.sheet.find_user(user_id)
         if user:
             kst = pytz.timezone('Asia/Seoul')
             today = datetime.now(kst).strftime('%Y-%m-%d')
-            self.sheet.update_user(user_id, {'last_tarot_date': today})
-            self.sheet.log_message(
+            await ctx.sheet.update_user(user_id, {'last_tarot_date': today})
+            await ctx.sheet.log_message(
                 user=ctx.author.name,
                 command='타로',
                 content=card_name
             )
-        
-        msg = f'**{card_name}**\n\n'
-        msg += f'{message}\n\n'
-        msg += f'추천 색: {color}\n'
-        msg += f'추천 장소: {place}\n'
-        msg += f'추천 물건: {item}'
-        
-        await ctx.send(msg)
     
-    @commands.command(name='주사위', aliases=['dice', 'd'])
+    @commands.hybrid_command(name='주사위', aliases=['dice', 'd'])
+    @app_commands.describe(sides='주사위 면 수 (2~100)')
     async def dice(self, ctx, sides: int = 6):
         """주사위를 굴립니다."""
         if sides < 2 or sides > 100:
@@ -154,21 +158,21 @@ class FunCog(commands.Cog, name="재미"):
         
         await ctx.send(f'{sides}면 주사위: {result}')
     
-    @commands.command(name='동전', aliases=['coin', 'flip'])
+    @commands.hybrid_command(name='동전', aliases=['coin', 'flip'])
     async def coin(self, ctx):
         """동전을 던집니다."""
         result = random.choice(['앞면', '뒷면'])
         
         await ctx.send(f'결과: {result}')
     
-    @commands.command(name='yn', aliases=['yesno'])
+    @commands.hybrid_command(name='yn', aliases=['yesno'])
     async def yn(self, ctx):
         """YES 또는 NO로 답합니다."""
         result = random.choice(['YES', 'NO'])
         
         await ctx.send(f'{result}')
     
-    @commands.command(name='운세', aliases=['fortune'])
+    @commands.hybrid_command(name='운세', aliases=['fortune'])
     async def fortune(self, ctx):
         """오늘의 운세를 봅니다."""
         fortunes = [
@@ -195,5 +199,4 @@ class FunCog(commands.Cog, name="재미"):
 
 async def setup(bot):
     """Cog 로드"""
-    sheet_manager = bot.sheet_manager
-    await bot.add_cog(FunCog(bot, sheet_manager))
+    await bot.add_cog(FunCog(bot))
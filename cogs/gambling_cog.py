@@ -2,66 +2,74 @@
 # 도박 관련 명령어
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 import random
 from datetime import datetime
 import pytz
+from guild_storage import uses_storage
 
 class GamblingCog(commands.Cog, name="도박"):
     """베팅 및 도박 게임"""
     
     MAX_BETS_PER_DAY = 3
     
-    def __init__(self, bot, sheet_manager):
+    def __init__(self, bot):
         self.bot = bot
-        self.sheet = sheet_manager
     
-    @commands.command(name='베팅', aliases=['bet', 'gamble'])
+    @commands.hybrid_command(name='베팅', aliases=['bet', 'gamble'])
+    @app_commands.describe(amount='베팅할 갈레온')
+    @uses_storage
     async def bet(self, ctx, amount: int):
         """갈레온을 베팅합니다. (배당률: -5x ~ +5x, 하루 최대 3번)"""
         user_id = str(ctx.author.id)
         
-        user = self.sheet.find_user(user_id)
-        if not user:
-            await ctx.send('먼저 !등록 명령어로 등록하세요.')
-            return
-        
-        if amount <= 0:
-            await ctx.send('1 이상의 갈레온만 베팅할 수 있습니다.')
-            return
-        
-        if user['galleons'] < 0:
-            await ctx.send('빚쟁이는 베팅할 수 없습니다.')
-            return
-        
-        if user['galleons'] < amount:
-            await ctx.send(f'갈레온이 부족합니다. (보유: {user["galleons"]}G)')
-            return
-        
-        kst = pytz.timezone('Asia/Seoul')
-        today = datetime.now(kst).strftime('%Y-%m-%d')
-        
-        if user['last_bet_date'] == today:
-            bet_count = user['bet_count']
-        else:
-            bet_count = 0
+        async with ctx.sheet.transaction(user_id) as tx:
+            user = tx.user(user_id)
+            if not user:
+                await ctx.send('먼저 !등록 명령어로 등록하세요.')
+                return
+            
+            if amount <= 0:
+                await ctx.send('1 이상의 갈레온만 베팅할 수 있습니다.')
+                return
+            
+            if user['galleons'] < 0:
+                await ctx.send('빚쟁이는 베팅할 수 없습니다.')
+                return
+            
+            if user['galleons'] < amount:
+                await ctx.send(f'갈레온이 부족합니다. (보유: {user["galleons"]}G)')
+                return
+            
+            kst = pytz.timezone('Asia/Seoul')
+            today = datetime.now(kst).strftime('%Y-%m-%d')
+            
+            if user['last_bet_date'] == today:
+                bet_count = user['bet_count']
+            else:
+                bet_count = 0
+            
+            if bet_count >= self.MAX_BETS_PER_DAY:
+                await ctx.send(f'오늘은 이미 {self.MAX_BETS_PER_DAY}번 베팅했습니다. 내일 다시 시도하세요.')
+                return
+            
+            multiplier = random.randint(-5, 5)
+            profit_loss = amount * multiplier
+            new_galleons = user['galleons'] + profit_loss
+            new_bet_count = bet_count + 1
+            
+            tx.update(user_id, {
+                'galleons': new_galleons,
+                'last_bet_date': today,
+                'bet_count': new_bet_count
+            })
         
-        if bet_count >= self.MAX_BETS_PER_DAY:
-            await ctx.send(f'오늘은 이미 {self.MAX_BETS_PER_DAY}번 베팅했습니다. 내일 다시 시도하세요.')
+        if not tx.committed:
+            await ctx.send('베팅 처리 중 오류가 발생했습니다.')
             return
         
-        multiplier = random.randint(-5, 5)
-        profit_loss = amount * multiplier
-        new_galleons = user['galleons'] + profit_loss
-        new_bet_count = bet_count + 1
-        
-        self.sheet.update_user(user_id, {
-            'galleons': new_galleons,
-            'last_bet_date': today,
-            'bet_count': new_bet_count
-        })
-        
-        self.sheet.log_message(
+        await ctx.sheet.log_message(
             user=ctx.author.name,
             command='베팅',
             content=f'{amount}G × {multiplier} = {profit_loss:+d}G'
@@ -85,5 +93,4 @@ class GamblingCog(commands.Cog, name="도박"):
 
 async def setup(bot):
     """Cog 로드"""
-    sheet_manager = bot.sheet_manager
-    await bot.add_cog(GamblingCog(bot, sheet_manager))
+    await bot.add_cog(GamblingCog(bot))
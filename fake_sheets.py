@@ -0,0 +1,428 @@
+# fake_sheets.py
+# 메모리 안의 가짜 구글 시트 (오프라인 테스트/성능 측정용)
+
+# gspread.Worksheet는 모든 요청을 Spreadsheet의 values_* / batch_update /
+# fetch_sheet_metadata 메서드로 보내므로, 여기서는 그 API 계층만 흉내 냄
+# → SheetManager는 실제 gspread.Worksheet 코드를 그대로 거치고,
+#   호출 횟수는 실제 Sheets API 요청 수와 같게 집계됨
+#
+# 사용 예:
+#     client = FakeClient(latency=0.2, rpm_limit=60)
+#     manager = SheetManager(None, 'test-sheet', client=client)
+#     print(client.total_calls, client.calls)
+
+import contextvars
+import copy
+import json
+import threading
+import time
+from collections import Counter, deque
+import gspread
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+# 요청을 발생시킨 작업 이름 (벤치마크에서 명령어별 요청 수 집계용)
+call_tag = contextvars.ContextVar('fake_sheets_call_tag', default=None)
+
+class FakeResponse:
+    """gspread.exceptions.APIError에 넘길 가짜 HTTP 응답"""
+    
+    def __init__(self, status_code, message, status):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = {'error': {'code': status_code, 'message': message, 'status': status}}
+        self.text = json.dumps(self._body, ensure_ascii=False)
+    
+    def json(self):
+        return self._body
+
+def api_error(status_code, message, status):
+    """실제 Sheets API와 같은 형태의 APIError 생성"""
+    return gspread.exceptions.APIError(FakeResponse(status_code, message, status))
+
+def _cell_text(value):
+    """기록된 값 → 표시 형식 문자열 (FORMATTED_VALUE처럼)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _split_range(range_name):
+    """"'시트'!A1:B2" → ('시트', 'A1:B2'), 범위가 없으면 ('시트', None)"""
+    if '!' in range_name:
+        title, a1 = range_name.rsplit('!', 1)
+    else:
+        title, a1 = range_name, None
+    
+    if len(title) >= 2 and title[0] == title[-1] == "'":
+        title = title[1:-1].replace("''", "'")
+    return title, a1
+
+class FakeClient:
+    """가짜 gspread 클라이언트 (모든 스프레드시트가 지연/할당량/호출 집계를 공유)"""
+    
+    def __init__(self, latency=0.0, rpm_limit=None):
+        # latency: 요청마다 기다릴 초 (숫자 또는 초를 돌려주는 함수)
+        # rpm_limit: 분당 요청 한도 (넘으면 APIError 429, None이면 무제한)
+        self.latency = latency
+        self.rpm_limit = rpm_limit
+        self.calls = Counter()
+        # call_tag별 요청 수 (태그가 없는 요청은 None, 예: 백그라운드 로그 기록)
+        self.calls_by_tag = Counter()
+        self.rejected = 0
+        self._recent = deque()
+        self._failures = deque()
+        self._spreadsheets = {}
+        self._lock = threading.RLock()
+    
+    @property
+    def total_calls(self):
+        """지금까지 처리한 요청 수 (할당량 초과로 거절된 요청 제외)"""
+        with self._lock:
+            return sum(self.calls.values())
+    
+    def reset_counters(self):
+        """호출 집계와 할당량 기록 초기화"""
+        with self._lock:
+            self.calls.clear()
+            self.calls_by_tag.clear()
+            self.rejected = 0
+            self._recent.clear()
+    
+    def fail_next(self, count=1, status_code=503):
+        """다음 count번의 요청을 지정한 오류로 실패시킴 (장애 재현용)"""
+        with self._lock:
+            self._failures.extend([status_code] * count)
+    
+    def request(self, method):
+        """요청 1회 처리 (지연 → 장애 주입 → 할당량 확인 → 집계)"""
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        
+        with self._lock:
+            if self._failures:
+                status_code = self._failures.popleft()
+                self._count(method)
+                raise api_error(status_code, 'The service is currently unavailable.', 'UNAVAILABLE')
+            
+            if self.rpm_limit is not None:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                
+                if len(self._recent) >= self.rpm_limit:
+                    self.rejected += 1
+                    raise api_error(
+                        429,
+                        "Quota exceeded for quota metric 'Read requests' and limit "
+                        "'Read requests per minute per user' of service 'sheets.googleapis.com'",
+                        'RESOURCE_EXHAUSTED'
+                    )
+                self._recent.append(now)
+            
+            self._count(method)
+    
+    def _count(self, method):
+        self.calls[method] += 1
+        self.calls_by_tag[call_tag.get()] += 1
+    
+    def open_by_key(self, key):
+        """스프레드시트 열기 (없는 키는 빈 스프레드시트로 생성)"""
+        self.request('fetch_sheet_metadata')
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = FakeSpreadsheet(self, key)
+            return self._spreadsheets[key]
+
+class FakeSpreadsheet:
+    """가짜 gspread.Spreadsheet"""
+    
+    def __init__(self, client, spreadsheet_id, title=None):
+        self.client = client
+        self.id = spreadsheet_id
+        self.title = title or spreadsheet_id
+        # 시트 ID → {'properties': ..., 'values': [[...], ...]}
+        self._sheets = {}
+        self._next_sheet_id = 0
+        self._lock = client._lock
+    
+    # ============================================
+    # 테스트 준비용 (요청으로 집계되지 않음)
+    # ============================================
+    
+    def load_rows(self, title, rows):
+        """시트 내용을 통째로 채움 (없으면 생성)"""
+        with self._lock:
+            sheet = self._find(title) or self._add_sheet({'title': title})
+            sheet['values'] = [[_cell_text(v) for v in row] for row in rows]
+            self._fit(sheet, len(rows), max([len(row) for row in rows] + [0]))
+    
+    def rows(self, title):
+        """시트 내용 복사본"""
+        with self._lock:
+            sheet = self._find(title)
+            return [list(row) for row in sheet['values']] if sheet else None
+    
+    # ============================================
+    # 내부 도우미
+    # ============================================
+    
+    def _find(self, title):
+        for sheet in self._sheets.values():
+            if sheet['properties']['title'] == title:
+                return sheet
+        return None
+    
+    def _sheet_for(self, range_name):
+        """범위 문자열 → (시트, 그리드 범위)"""
+        title, a1 = _split_range(range_name)
+        sheet = self._find(title)
+        if not sheet:
+            raise api_error(400, f'Unable to parse range: {range_name}', 'INVALID_ARGUMENT')
+        return sheet, a1_range_to_grid_range(a1) if a1 else {}
+    
+    def _add_sheet(self, properties):
+        sheet_id = properties.get('sheetId', self._next_sheet_id)
+        if sheet_id in self._sheets or self._find(properties.get('title')):
+            raise api_error(400, f"A sheet with the name \"{properties.get('title')}\" already exists.",
+                            'INVALID_ARGUMENT')
+        
+        grid = properties.get('gridProperties', {})
+        sheet = {
+            'properties': {
+                'sheetId': sheet_id,
+                'title': properties.get('title', f'Sheet{sheet_id}'),
+                'index': len(self._sheets),
+                'sheetType': 'GRID',
+                'gridProperties': {
+                    'rowCount': grid.get('rowCount', 1000),
+                    'columnCount': grid.get('columnCount', 26)
+                }
+            },
+            'values': []
+        }
+        self._sheets[sheet_id] = sheet
+        self._next_sheet_id = max(self._next_sheet_id, sheet_id) + 1
+        return sheet
+    
+    def _fit(self, sheet, rows, cols):
+        """기록한 만큼 그리드 크기 확장"""
+        grid = sheet['properties']['gridProperties']
+        grid['rowCount'] = max(grid['rowCount'], rows)
+        grid['columnCount'] = max(grid['columnCount'], cols)
+    
+    def _write(self, sheet, start_row, start_col, values):
+        """(start_row, start_col) 위치부터 값 기록 (0부터 시작)"""
+        rows = sheet['values']
+        for r, row_values in enumerate(values):
+            row_index = start_row + r
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            for c, value in enumerate(row_values):
+                col_index = start_col + c
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = _cell_text(value)
+        
+        width = max([len(row) for row in values] + [0])
+        self._fit(sheet, start_row + len(values), start_col + width)
+    
+    def _read(self, sheet, grid, major_dimension='ROWS'):
+        """그리드 범위의 값 (뒤쪽 빈 칸/빈 행은 실제 API처럼 잘라냄)"""
+        rows = sheet['values']
+        start_row = grid.get('startRowIndex', 0)
+        end_row = grid.get('endRowIndex', len(rows))
+        start_col = grid.get('startColumnIndex', 0)
+        end_col = grid.get('endColumnIndex')
+        
+        values = []
+        for row in rows[start_row:end_row]:
+            cells = row[start_col:end_col] if end_col is not None else row[start_col:]
+            while cells and cells[-1] == '':
+                cells = cells[:-1]
+            values.append(list(cells))
+        while values and not values[-1]:
+            values.pop()
+        
+        if major_dimension == 'COLUMNS':
+            width = max([len(row) for row in values] + [0])
+            values = [[row[c] if c < len(row) else '' for row in values] for c in range(width)]
+            for column in values:
+                while column and column[-1] == '':
+                    column.pop()
+        return values
+    
+    def _value_range(self, range_name, params=None):
+        sheet, grid = self._sheet_for(range_name)
+        major_dimension = (params or {}).get('majorDimension', 'ROWS')
+        result = {'range': range_name, 'majorDimension': major_dimension}
+        values = self._read(sheet, grid, major_dimension)
+        if values:
+            result['values'] = values
+        return result
+    
+    # ============================================
+    # Sheets API (요청 1회씩 집계)
+    # ============================================
+    
+    def fetch_sheet_metadata(self, params=None):
+        self.client.request('fetch_sheet_metadata')
+        with self._lock:
+            return {
+                'spreadsheetId': self.id,
+                'properties': {'title': self.title},
+                'sheets': [
+                    {'properties': copy.deepcopy(sheet['properties'])}
+                    for sheet in sorted(self._sheets.values(), key=lambda s: s['properties']['index'])
+                ]
+            }
+    
+    def worksheets(self):
+        metadata = self.fetch_sheet_metadata()
+        return [gspread.Worksheet(self, sheet['properties']) for sheet in metadata['sheets']]
+    
+    def worksheet(self, title):
+        for ws in self.worksheets():
+            if ws.title == title:
+                return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+    
+    def add_worksheet(self, title, rows, cols, index=None):
+        response = self.batch_update({'requests': [{
+            'addSheet': {'properties': {
+                'title': title,
+                'gridProperties': {'rowCount': rows, 'columnCount': cols}
+            }}
+        }]})
+        return gspread.Worksheet(self, response['replies'][0]['addSheet']['properties'])
+    
+    def del_worksheet(self, worksheet):
+        return self.batch_update({'requests': [{'deleteSheet': {'sheetId': worksheet.id}}]})
+    
+    def batch_update(self, body):
+        """addSheet / deleteSheet / updateSheetProperties / updateCells / appendDimension 지원"""
+        self.client.request('batch_update')
+        with self._lock:
+            replies = []
+            for request in body.get('requests', []):
+                kind, args = next(iter(request.items()))
+                
+                if kind == 'addSheet':
+                    sheet = self._add_sheet(args.get('properties', {}))
+                    replies.append({'addSheet': {'properties': copy.deepcopy(sheet['properties'])}})
+                    continue
+                
+                sheet_id = (args.get('start') or args.get('properties') or args).get('sheetId')
+                sheet = self._sheets.get(sheet_id)
+                if sheet is None:
+                    raise api_error(400, f'No grid with id: {sheet_id}', 'INVALID_ARGUMENT')
+                
+                if kind == 'deleteSheet':
+                    del self._sheets[sheet_id]
+                elif kind == 'updateSheetProperties':
+                    properties = args['properties']
+                    for field in args.get('fields', '').split(','):
+                        field = field.strip()
+                        if field == 'title':
+                            sheet['properties']['title'] = properties['title']
+                        elif field.startswith(('gridProperties.', 'gridProperties/')):
+                            name = field[len('gridProperties.'):]
+                            sheet['properties']['gridProperties'][name] = properties['gridProperties'][name]
+                            # 그리드를 줄이면 바깥 칸의 값은 사라짐
+                            if name == 'rowCount':
+                                del sheet['values'][properties['gridProperties'][name]:]
+                            elif name == 'columnCount':
+                                for row in sheet['values']:
+                                    del row[properties['gridProperties'][name]:]
+                elif kind == 'updateCells':
+                    start = args['start']
+                    values = [
+                        [next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values()))
+                         for cell in row.get('values', [])]
+                        for row in args.get('rows', [])
+                    ]
+                    self._write(sheet, start.get('rowIndex', 0), start.get('columnIndex', 0), values)
+                elif kind == 'appendDimension':
+                    key = 'rowCount' if args['dimension'] == 'ROWS' else 'columnCount'
+                    sheet['properties']['gridProperties'][key] += args['length']
+                else:
+                    raise NotImplementedError(f'가짜 시트에서 지원하지 않는 요청: {kind}')
+                replies.append({})
+            
+            return {'spreadsheetId': self.id, 'replies': replies}
+    
+    def values_get(self, range_name, params=None):
+        self.client.request('values_get')
+        with self._lock:
+            return self._value_range(range_name, params)
+    
+    def values_batch_get(self, ranges, params=None):
+        self.client.request('values_batch_get')
+        with self._lock:
+            return {
+                'spreadsheetId': self.id,
+                'valueRanges': [self._value_range(range_name, params) for range_name in ranges]
+            }
+    
+    def values_update(self, range_name, params=None, body=None):
+        self.client.request('values_update')
+        with self._lock:
+            sheet, grid = self._sheet_for(range_name)
+            values = (body or {}).get('values', [])
+            self._write(sheet, grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0), values)
+            return {'spreadsheetId': self.id, 'updatedRange': range_name, 'updatedRows': len(values)}
+    
+    def values_batch_update(self, body=None):
+        self.client.request('values_batch_update')
+        with self._lock:
+            responses = []
+            for data in (body or {}).get('data', []):
+                sheet, grid = self._sheet_for(data['range'])
+                values = data.get('values', [])
+                self._write(sheet, grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0), values)
+                responses.append({'updatedRange': data['range'], 'updatedRows': len(values)})
+            return {'spreadsheetId': self.id, 'totalUpdatedRows': sum(r['updatedRows'] for r in responses),
+                    'responses': responses}
+    
+    def values_append(self, range_name, params=None, body=None):
+        """마지막으로 값이 있는 행 다음에 추가"""
+        self.client.request('values_append')
+        with self._lock:
+            sheet, grid = self._sheet_for(range_name)
+            values = (body or {}).get('values', [])
+            
+            start_row = len(self._read(sheet, {}))
+            start_col = grid.get('startColumnIndex', 0)
+            self._write(sheet, start_row, start_col, values)
+            
+            width = max([len(row) for row in values] + [1])
+            title = sheet['properties']['title'].replace("'", "''")
+            updated_range = (f"'{title}'!{rowcol_to_a1(start_row + 1, start_col + 1)}:"
+                             f"{rowcol_to_a1(start_row + len(values), start_col + width)}")
+            return {
+                'spreadsheetId': self.id,
+                'updates': {
+                    'spreadsheetId': self.id,
+                    'updatedRange': updated_range,
+                    'updatedRows': len(values),
+                    'updatedColumns': width,
+                    'updatedCells': sum(len(row) for row in values)
+                }
+            }
+    
+    def values_clear(self, range_name):
+        self.client.request('values_clear')
+        with self._lock:
+            sheet, grid = self._sheet_for(range_name)
+            start_row = grid.get('startRowIndex', 0)
+            end_row = grid.get('endRowIndex', len(sheet['values']))
+            start_col = grid.get('startColumnIndex', 0)
+            for row in sheet['values'][start_row:end_row]:
+                end_col = grid.get('endColumnIndex', len(row))
+                for c in range(start_col, min(end_col, len(row))):
+                    row[c] = ''
+            return {'spreadsheetId': self.id, 'clearedRange': range_name}
@@ -0,0 +1,173 @@
+# guild_storage.py
+# 서버(길드)별 스프레드시트 등록부와 저장소 풀
+
+import asyncio
+import functools
+import json
+import os
+import time
+from collections import OrderedDict
+from async_sheet_manager import AsyncSheetManager
+
+# 연결에 실패한 스프레드시트를 다시 연결해 보기까지 기다리는 시간 (초)
+RETRY_CONNECT_INTERVAL = 60
+
+def uses_storage(func):
+    """ctx.sheet(서버 저장소)를 쓰는 명령어로 표시 (명령어 데코레이터 아래, 함수 바로 위에 붙임)"""
+    # bot.before_invoke는 표시된 명령어에만 저장소를 빌려주고 연결을 기다림.
+    # 표시되지 않은 명령어(!도움말, !주사위 등)는 시작 중에도 바로 실행되고 ctx.sheet는 None
+    func.uses_storage = True
+    return func
+
+class GuildRegistry:
+    """서버 ID → 스프레드시트 ID (등록되지 않은 서버는 기본 스프레드시트를 함께 사용)"""
+    
+    # 파일 형식: {"서버 ID": "스프레드시트 ID", ...}
+    # 여러 서버를 같은 스프레드시트에 연결하면 경제도 함께 씀
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._sheets = {}
+        
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._sheets = {
+                    str(guild_id).strip(): str(sheet_id).strip()
+                    for guild_id, sheet_id in json.load(f).items()
+                    if str(sheet_id).strip()
+                }
+    
+    def __len__(self):
+        return len(self._sheets)
+    
+    def sheet_id(self, guild_id):
+        """서버에 연결된 스프레드시트 ID (없으면 None)"""
+        if guild_id is None:
+            return None
+        return self._sheets.get(str(guild_id))
+
+class _Entry:
+    """풀에 열려 있는 저장소 1개"""
+    
+    def __init__(self, manager, task):
+        self.manager = manager
+        # 연결 작업 (끝나기 전에는 닫지 않음)
+        self.task = task
+        # 명령어가 사용 중인 수 (0일 때만 닫음)
+        self.leases = 0
+        self.failed_at = None
+
+class StoragePool:
+    """스프레드시트별 저장소를 처음 쓸 때 만들고, 최대 max_open개만 열어 둠 (오래 안 쓴 것부터 닫음)"""
+    
+    # 스프레드시트마다 SheetManager(캐시, 로그 버퍼, 스레드 풀)가 하나씩 생기므로
+    # 서버 수가 많아도 메모리/스레드가 max_open개 분량을 넘지 않도록 제한함.
+    # 같은 스프레드시트를 쓰는 서버들은 저장소 하나를 함께 씀
+    
+    def __init__(self, registry, default, create, default_sheet_id=None, max_open=8, max_workers=4, metrics=None):
+        self.registry = registry
+        # 기본 스프레드시트 저장소 (항상 열려 있고 max_open에 포함하지 않음)
+        self.default = default
+        # 등록부가 기본 스프레드시트를 가리키면 저장소를 새로 만들지 않고 기본 저장소를 씀
+        # (같은 저널/스냅샷/SQLite 파일을 캐시와 잠금이 다른 저장소 두 개가 함께 쓰지 않도록)
+        self.default_sheet_id = default_sheet_id
+        # create(sheet_id): 스프레드시트 저장소 생성 (스레드 풀에서 실행)
+        self.create = create
+        self.max_open = max_open
+        self.max_workers = max_workers
+        self.metrics = metrics
+        # 스프레드시트 ID → _Entry (가장 오래 안 쓴 것이 앞)
+        self._open = OrderedDict()
+        # 스프레드시트 ID → 닫는 중인 작업
+        self._closing = {}
+    
+    def __len__(self):
+        return len(self._open)
+    
+    def acquire(self, guild):
+        """서버의 저장소 (없으면 만들어 연결 시작), 다 쓰면 release로 반납"""
+        sheet_id = self.registry.sheet_id(guild.id) if guild is not None else None
+        if sheet_id is None or sheet_id == self.default_sheet_id:
+            return self.default
+        
+        entry = self._open.get(sheet_id)
+        if (entry is not None and entry.failed_at is not None
+                and time.monotonic() - entry.failed_at > RETRY_CONNECT_INTERVAL):
+            # 연결에 실패했던 스프레드시트는 잠시 뒤 다시 연결해 봄
+            self._close(sheet_id)
+            entry = None
+        
+        if entry is None:
+            entry = self._start(sheet_id)
+            self._evict()
+        
+        self._open.move_to_end(sheet_id)
+        entry.leases += 1
+        return entry.manager
+    
+    def release(self, manager):
+        """acquire로 받은 저장소 반납"""
+        for entry in self._open.values():
+            if entry.manager is manager:
+                entry.leases -= 1
+                return
+    
+    def _start(self, sheet_id):
+        """저장소를 만들고 연결은 백그라운드에서 진행 (명령어는 wait_ready로 기다림)"""
+        manager = AsyncSheetManager(max_workers=self.max_workers, metrics=self.metrics)
+        entry = _Entry(manager, None)
+        entry.task = asyncio.create_task(self._connect(sheet_id, entry))
+        self._open[sheet_id] = entry
+        return entry
+    
+    async def _connect(self, sheet_id, entry):
+        """스프레드시트 연결 (실패해도 예외를 밖으로 내보내지 않음)"""
+        try:
+            closing = self._closing.get(sheet_id)
+            if closing is not None:
+                # 방금 닫은 저장소의 남은 기록이 끝난 뒤에 읽어야 최신 상태가 됨
+                await asyncio.gather(closing, return_exceptions=True)
+            await entry.manager.open(functools.partial(self.create, sheet_id))
+            print(f'[GUILD] 스프레드시트 연결: {sheet_id} (열린 저장소 {len(self._open)}개)')
+        except Exception as e:
+            entry.failed_at = time.monotonic()
+            print(f'[GUILD ERROR] 스프레드시트 {sheet_id} 연결 실패: {e}')
+    
+    def _evict(self):
+        """max_open개를 넘으면 사용 중이 아닌 저장소를 오래 안 쓴 순서로 닫음"""
+        while len(self._open) > self.max_open:
+            idle = next(
+                (sheet_id for sheet_id, entry in self._open.items()
+                 if entry.leases <= 0 and entry.task.done()),
+                None
+            )
+            if idle is None:
+                # 모두 사용 중이면 잠시 max_open을 넘겨 두고 다음에 다시 정리
+                return
+            
+            print(f'[GUILD] 오래 사용하지 않은 스프레드시트 닫는 중: {idle}')
+            self._close(idle)
+    
+    def _close(self, sheet_id):
+        """풀에서 빼고 백그라운드에서 닫음 (남은 기록 마무리)"""
+        entry = self._open.pop(sheet_id)
+        task = asyncio.create_task(entry.manager.close())
+        self._closing[sheet_id] = task
+        
+        def done(_):
+            if self._closing.get(sheet_id) is task:
+                del self._closing[sheet_id]
+        
+        task.add_done_callback(done)
+    
+    async def close(self):
+        """풀의 모든 저장소를 닫음 (기본 저장소는 제외, 남은 기록 마무리)"""
+        entries = list(self._open.values())
+        self._open.clear()
+        
+        await asyncio.gather(*[entry.task for entry in entries], return_exceptions=True)
+        await asyncio.gather(
+            *[entry.manager.close() for entry in entries],
+            *list(self._closing.values()),
+            return_exceptions=True
+        )
@@ -0,0 +1,36 @@
+# inventory.py
+# 사용자 아이템 칸 인코딩 ("이름:개수" 쉼표 구분)
+
+# 예전 형식은 같은 이름을 개수만큼 반복 ("포션,포션,쿠키")
+# 새 형식은 "포션:2,쿠키" 처럼 개수를 붙이고, 1개면 이름만 씀
+# 두 형식이 섞여 있어도 읽을 수 있으므로 변환 전후 모두 호환됨
+
+def parse_inventory(text):
+    """아이템 칸 문자열 → {아이템명: 개수}"""
+    counts = {}
+    if not text:
+        return counts
+    
+    for entry in str(text).split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        
+        name, count = entry, 1
+        if ':' in entry:
+            head, tail = entry.rsplit(':', 1)
+            if tail.strip().isdigit():
+                name, count = head.strip(), int(tail)
+        
+        if name and count > 0:
+            counts[name] = counts.get(name, 0) + count
+    
+    return counts
+
+def format_inventory(counts):
+    """{아이템명: 개수} → 아이템 칸 문자열"""
+    return ','.join(
+        f'{name}:{count}' if count > 1 else name
+        for name, count in counts.items()
+        if count > 0
+    )
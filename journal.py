@@ -0,0 +1,67 @@
+# journal.py
+# 쓰기 지연 모드용 로컬 저널 (추가 전용, 재시작 시 재적용)
+
+import json
+import os
+import threading
+
+class Journal:
+    """시트에 기록하기 전의 변경 사항을 파일에 먼저 남김"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.seq = 0
+        
+        for entry in self.read():
+            self.seq = max(self.seq, entry.get('seq', 0))
+        
+        self._file = open(self.path, 'a', encoding='utf-8')
+    
+    def read(self):
+        """저널 항목 전체 (마지막 줄이 깨졌으면 무시)"""
+        if not os.path.exists(self.path):
+            return []
+        
+        entries = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[JOURNAL WARNING] 손상된 저널 항목을 건너뜁니다: {line[:50]}")
+        
+        return entries
+    
+    def append(self, user_id, updates):
+        """변경 사항 기록 (디스크에 저장된 뒤 반환)"""
+        with self._lock:
+            self.seq += 1
+            entry = {'seq': self.seq, 'id': str(user_id), 'updates': updates}
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return self.seq
+    
+    def compact(self, upto_seq):
+        """시트에 반영된 항목(upto_seq 이하) 제거"""
+        with self._lock:
+            remaining = [e for e in self.read() if e.get('seq', 0) > upto_seq]
+            
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,102 @@
+# log_buffer.py
+# 로그 시트 일괄 기록 버퍼
+
+import contextlib
+import threading
+from collections import deque
+
+class LogBuffer:
+    """로그 행을 모아 두었다가 한 번의 요청으로 기록"""
+    
+    def __init__(self, write_rows, batch_size=20, flush_interval=10.0, max_size=1000):
+        # write_rows(rows): 여러 행을 한 번에 기록, 실패 시 예외 발생
+        self._write_rows = write_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self.dropped = 0
+        
+        self._thread = threading.Thread(target=self._run, name='log-buffer', daemon=True)
+        self._thread.start()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+    
+    def add(self, row):
+        """로그 행 추가 (가득 차면 가장 오래된 행을 버림)"""
+        with self._lock:
+            self._trim(1)
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+        
+        if full:
+            self._wakeup.set()
+    
+    def pending(self):
+        """아직 기록되지 않은 로그 행 복사본 (오래된 순)"""
+        with self._lock:
+            return [list(row) for row in self._rows]
+    
+    @contextlib.contextmanager
+    def hold(self):
+        """with 블록 동안 기록을 멈춤 (기록된 행과 남은 행을 함께 읽을 때 사용)"""
+        with self._flush_lock:
+            yield
+    
+    def _trim(self, incoming):
+        """버퍼 크기 제한 유지 (잠금 안에서 호출)"""
+        overflow = len(self._rows) + incoming - self.max_size
+        if overflow <= 0:
+            return
+        
+        for _ in range(min(overflow, len(self._rows))):
+            self._rows.popleft()
+        
+        if self.dropped == 0:
+            print(f"[LOG WARNING] 로그 버퍼가 가득 차 오래된 로그를 버립니다. (최대 {self.max_size}개)")
+        self.dropped += overflow
+    
+    def flush(self):
+        """쌓인 로그를 모두 기록"""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._rows)
+                self._rows.clear()
+            
+            if not rows:
+                return True
+            
+            try:
+                self._write_rows(rows)
+                return True
+            
+            except Exception as e:
+                print(f"[LOG ERROR] 로그 {len(rows)}개 기록 실패: {e}")
+                with self._lock:
+                    # 실패한 행은 다음 기록 때 다시 시도 (새 로그보다 앞에)
+                    self._rows.extendleft(reversed(rows))
+                    self._trim(0)
+                return False
+    
+    def _run(self):
+        """batch_size개가 쌓이거나 flush_interval초가 지나면 기록"""
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._closed.is_set() and not self.flush():
+                # 시트 장애 중에는 로그가 쌓여도 재시도 간격을 유지
+                self._closed.wait(self.flush_interval)
+    
+    def close(self):
+        """백그라운드 기록 중지 후 남은 로그 모두 기록"""
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join()
+        return self.flush()
@@ -0,0 +1,52 @@
+# log_index.py
+# 사용자별 최근 로그 인덱스 (로그를 기록할 때마다 그때그때 갱신)
+
+import threading
+from collections import deque
+
+class LogIndex:
+    """사용자 이름 → 최근 로그 행 (오래된 행은 자동으로 밀려남)"""
+    
+    # 로그 시트를 훑지 않고 !기록에 답하기 위한 인덱스라서
+    # 사용자마다 최근 max_per_user개만 남김
+    
+    def __init__(self, max_per_user=50):
+        self.max_per_user = max_per_user
+        self.seeded = False
+        # 사용자 이름 → deque([타임스탬프, 사용자, 명령어, 내용])
+        self._rows = {}
+        self._lock = threading.Lock()
+    
+    def add(self, row):
+        """로그 행 1개 추가"""
+        with self._lock:
+            self._add(row)
+    
+    def reset(self, rows):
+        """시트에서 읽은 로그(오래된 순)로 인덱스를 새로 구성"""
+        with self._lock:
+            self._rows = {}
+            for row in rows:
+                self._add(row)
+            self.seeded = True
+    
+    def _add(self, row):
+        """잠금 안에서 호출"""
+        name = str(row[1]).strip()
+        if not name:
+            return
+        
+        rows = self._rows.get(name)
+        if rows is None:
+            rows = self._rows[name] = deque(maxlen=self.max_per_user)
+        rows.append(list(row))
+    
+    def recent(self, user_name, limit=10):
+        """사용자의 최근 로그 limit개 (최신순, 로그 시트와 같은 키)"""
+        with self._lock:
+            rows = list(self._rows.get(str(user_name).strip(), ()))
+        
+        return [
+            {'타임스탬프': row[0], '사용자': row[1], '명령어': row[2], '내용': row[3]}
+            for row in reversed(rows[-limit:])
+        ]
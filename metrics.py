@@ -0,0 +1,261 @@
+# metrics.py
+# 명령어/저장소 호출 계측 (횟수, 오류, 지연 시간 히스토그램, 명령어별 Sheets API 요청 수)
+
+import contextvars
+import functools
+import threading
+import time
+
+# 지금 실행 중인 명령어 이름 (명령어 밖의 요청은 None → 백그라운드)
+# AsyncSheetManager가 contextvars를 스레드 풀까지 전달하므로 시트 요청도 명령어별로 집계됨
+current_command = contextvars.ContextVar('current_command', default=None)
+
+# 히스토그램 구간 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+BACKGROUND = '(백그라운드)'
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram과 같은 형태)"""
+    
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 분위수 추정값 (초)"""
+        if self.count == 0:
+            return 0.0
+        
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if bucket_count and seen + bucket_count >= target:
+                return lower + (upper - lower) * (target - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+class Stat:
+    """이름 하나(명령어 또는 저장소 메서드)의 집계"""
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.api_calls = 0
+        self.api_errors = 0
+
+class Metrics:
+    """봇 프로세스 전체의 계측 값 (여러 스레드에서 동시에 기록)"""
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self.commands = {}
+        self.storage = {}
+        # 시트 요청 스케줄러: 우선순위별 대기 시간, 상태 코드별 재시도 횟수
+        self.queue_waits = {}
+        self.retries = {}
+        # 이름 → (설명, 현재 값을 돌려주는 함수)
+        self._gauges = {}
+        self._lock = threading.Lock()
+    
+    def _stat(self, table, name):
+        stat = table.get(name)
+        if stat is None:
+            stat = table[name] = Stat()
+        return stat
+    
+    def record_command(self, name, seconds, failed=False):
+        """명령어 1회 실행 기록"""
+        with self._lock:
+            stat = self._stat(self.commands, name)
+            stat.count += 1
+            stat.errors += int(failed)
+            stat.latency.observe(seconds)
+    
+    def record_storage(self, method, seconds, failed=False):
+        """저장소 메서드 1회 호출 기록"""
+        with self._lock:
+            stat = self._stat(self.storage, method)
+            stat.count += 1
+            stat.errors += int(failed)
+            stat.latency.observe(seconds)
+    
+    def record_api_call(self, failed=False):
+        """Sheets API 요청 1회를 지금 실행 중인 명령어에 기록"""
+        name = current_command.get() or BACKGROUND
+        with self._lock:
+            stat = self._stat(self.commands, name)
+            stat.api_calls += 1
+            stat.api_errors += int(failed)
+    
+    def record_queue_wait(self, priority, seconds):
+        """시트 요청이 스케줄러에서 기다린 시간 기록"""
+        with self._lock:
+            histogram = self.queue_waits.get(priority)
+            if histogram is None:
+                histogram = self.queue_waits[priority] = Histogram()
+            histogram.observe(seconds)
+    
+    def record_retry(self, status):
+        """시트 요청 재시도 1회 기록"""
+        with self._lock:
+            self.retries[status] = self.retries.get(status, 0) + 1
+    
+    def add_gauge(self, name, help_text, func):
+        """현재 값을 그때그때 읽는 지표 등록 (예: 대기열 길이)"""
+        with self._lock:
+            self._gauges[name] = (help_text, func)
+    
+    def reset(self):
+        """모든 집계 초기화"""
+        with self._lock:
+            self.started_at = time.time()
+            self.commands = {}
+            self.storage = {}
+            self.queue_waits = {}
+            self.retries = {}
+    
+    def snapshot(self):
+        """집계 복사본 ({'commands': {...}, 'storage': {...}})"""
+        def rows(table):
+            return {
+                name: {
+                    'count': stat.count,
+                    'errors': stat.errors,
+                    'p50': stat.latency.quantile(0.5),
+                    'p95': stat.latency.quantile(0.95),
+                    'p99': stat.latency.quantile(0.99),
+                    'sum': stat.latency.sum,
+                    'buckets': list(stat.latency.counts),
+                    'api_calls': stat.api_calls,
+                    'api_errors': stat.api_errors
+                }
+                for name, stat in table.items()
+            }
+        
+        with self._lock:
+            gauges = dict(self._gauges)
+            snapshot = {
+                'uptime': time.time() - self.started_at,
+                'commands': rows(self.commands),
+                'storage': rows(self.storage),
+                'queue_waits': {
+                    name: {
+                        'count': histogram.count,
+                        'p50': histogram.quantile(0.5),
+                        'p95': histogram.quantile(0.95),
+                        'sum': histogram.sum,
+                        'buckets': list(histogram.counts)
+                    }
+                    for name, histogram in self.queue_waits.items()
+                },
+                'retries': dict(self.retries)
+            }
+        
+        # 지표 함수가 다른 잠금을 잡을 수 있으므로 잠금 밖에서 호출
+        snapshot['gauges'] = {name: (help_text, func()) for name, (help_text, func) in gauges.items()}
+        return snapshot
+    
+    def prometheus(self):
+        """Prometheus 텍스트 형식으로 출력"""
+        snapshot = self.snapshot()
+        lines = []
+        
+        def histogram(metric, help_text, label, table):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for name, row in sorted(table.items()):
+                labels = f'{label}="{_escape(name)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + ('+Inf',), row['buckets']):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{labels}}} {row["sum"]}')
+                lines.append(f'{metric}_count{{{labels}}} {row["count"]}')
+        
+        def counter(metric, help_text, label, table, key):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for name, row in sorted(table.items()):
+                lines.append(f'{metric}{{{label}="{_escape(name)}"}} {row[key]}')
+        
+        commands = snapshot['commands']
+        executed = {name: row for name, row in commands.items() if row['count']}
+        histogram('rpgbot_command_duration_seconds', '명령어 처리 시간', 'command', executed)
+        counter('rpgbot_command_errors_total', '실패한 명령어 수', 'command', executed, 'errors')
+        counter('rpgbot_sheets_api_requests_total', '명령어별 Sheets API 요청 수', 'command', commands, 'api_calls')
+        counter('rpgbot_sheets_api_errors_total', '명령어별 실패한 Sheets API 요청 수', 'command', commands, 'api_errors')
+        histogram('rpgbot_storage_call_duration_seconds', '저장소 메서드 처리 시간 (스레드 풀 대기 포함)',
+                  'method', snapshot['storage'])
+        counter('rpgbot_storage_call_errors_total', '예외가 발생한 저장소 호출 수', 'method',
+                snapshot['storage'], 'errors')
+        
+        histogram('rpgbot_sheets_queue_wait_seconds', '시트 요청이 스케줄러에서 기다린 시간', 'priority',
+                  snapshot['queue_waits'])
+        counter('rpgbot_sheets_retries_total', '시트 요청 재시도 횟수', 'status',
+                {str(status): {'count': count} for status, count in snapshot['retries'].items()}, 'count')
+        for name, (help_text, value) in sorted(snapshot['gauges'].items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        
+        lines.append('# HELP rpgbot_uptime_seconds 집계 시작 후 경과 시간')
+        lines.append('# TYPE rpgbot_uptime_seconds gauge')
+        lines.append(f'rpgbot_uptime_seconds {snapshot["uptime"]:.0f}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    """Prometheus 라벨 값 이스케이프"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def instrument_client(client, metrics):
+    """gspread 클라이언트의 모든 API 요청을 집계 (client.request를 감쌈)"""
+    request = client.request
+    
+    @functools.wraps(request)
+    def counted_request(*args, **kwargs):
+        try:
+            response = request(*args, **kwargs)
+        except Exception:
+            metrics.record_api_call(failed=True)
+            raise
+        metrics.record_api_call()
+        return response
+    
+    client.request = counted_request
+    return client
+
+async def start_metrics_server(metrics, host, port):
+    """/metrics 경로로 Prometheus 텍스트를 제공하는 HTTP 서버 시작 (aiohttp.web.AppRunner 반환)"""
+    from aiohttp import web
+    
+    async def handle(request):
+        return web.Response(
+            body=metrics.prometheus().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+    
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f'[METRICS] http://{host}:{port}/metrics 에서 계측 값 제공')
+    return runner
@@ -0,0 +1,150 @@
+# ranking.py
+# 갈레온 순위 / 기숙사 점수 합계 인덱스 (사용자 변경 시 그때그때 갱신)
+
+import bisect
+import threading
+
+# 이 필드가 바뀔 때만 인덱스를 갱신
+RANK_FIELDS = {'name', 'galleons', 'house', 'house_score'}
+
+class RankingIndex:
+    """갈레온 내림차순으로 정렬된 사용자 목록과 기숙사별 점수 합계"""
+    
+    # _entries는 (-갈레온, 사용자 ID) 순서로 정렬된 리스트라서
+    # 순위 찾기는 이분 탐색, 상위 K명은 앞에서 K개만 읽으면 됨 (시트 요청 없음)
+    
+    def __init__(self):
+        self.loaded = False
+        self._entries = []
+        # 사용자 ID → {'name', 'galleons', 'house', 'house_score'}
+        self._users = {}
+        # 기숙사 → {'score': 점수 합계, 'galleons': 갈레온 합계, 'members': 인원}
+        self._houses = {}
+        self._lock = threading.Lock()
+    
+    def clear(self):
+        """인덱스 비우기 (다음 조회 때 다시 구성)"""
+        with self._lock:
+            self._entries = []
+            self._users = {}
+            self._houses = {}
+            self.loaded = False
+    
+    def rebuild(self, users):
+        """전체 사용자 목록으로 인덱스 구성"""
+        with self._lock:
+            self._entries = []
+            self._users = {}
+            self._houses = {}
+            for user in users:
+                self._insert(str(user['id']).strip(), user)
+            self._entries.sort()
+            self.loaded = True
+    
+    def update(self, user):
+        """사용자 1명의 순위 정보 갱신 (새 사용자면 추가)"""
+        key = str(user['id']).strip()
+        with self._lock:
+            if not self.loaded:
+                return
+            self._remove(key)
+            self._insert(key, user, keep_sorted=True)
+    
+    def apply(self, user_id, fields):
+        """변경된 필드만 반영 (인덱스에 없는 사용자는 무시)"""
+        if not RANK_FIELDS & set(fields):
+            return
+        
+        key = str(user_id).strip()
+        with self._lock:
+            current = self._users.get(key)
+            if not self.loaded or current is None:
+                return
+            user = dict(current, **{k: v for k, v in fields.items() if k in RANK_FIELDS})
+            self._remove(key)
+            self._insert(key, user, keep_sorted=True)
+    
+    def _insert(self, key, user, keep_sorted=False):
+        """잠금 안에서 호출"""
+        entry = {
+            'name': user.get('name', ''),
+            'galleons': int(user.get('galleons') or 0),
+            'house': str(user.get('house') or '').strip(),
+            'house_score': int(user.get('house_score') or 0)
+        }
+        self._users[key] = entry
+        
+        item = (-entry['galleons'], key)
+        if keep_sorted:
+            bisect.insort(self._entries, item)
+        else:
+            self._entries.append(item)
+        
+        if entry['house']:
+            house = self._houses.setdefault(entry['house'], {'score': 0, 'galleons': 0, 'members': 0})
+            house['score'] += entry['house_score']
+            house['galleons'] += entry['galleons']
+            house['members'] += 1
+    
+    def _remove(self, key):
+        """잠금 안에서 호출"""
+        entry = self._users.pop(key, None)
+        if entry is None:
+            return
+        
+        index = bisect.bisect_left(self._entries, (-entry['galleons'], key))
+        if index < len(self._entries) and self._entries[index] == (-entry['galleons'], key):
+            del self._entries[index]
+        
+        house = self._houses.get(entry['house'])
+        if house is not None:
+            house['score'] -= entry['house_score']
+            house['galleons'] -= entry['galleons']
+            house['members'] -= 1
+            if house['members'] <= 0:
+                del self._houses[entry['house']]
+    
+    def _rank_of(self, galleons):
+        """갈레온이 같으면 같은 순위 (잠금 안에서 호출)"""
+        return bisect.bisect_left(self._entries, (-galleons, '')) + 1
+    
+    def top(self, limit=10):
+        """갈레온 상위 limit명 ([{'rank', 'id', 'name', 'galleons'}])"""
+        with self._lock:
+            result = []
+            for negative_galleons, key in self._entries[:limit]:
+                result.append({
+                    'rank': self._rank_of(-negative_galleons),
+                    'id': key,
+                    'name': self._users[key]['name'],
+                    'galleons': -negative_galleons
+                })
+            return result
+    
+    def rank(self, user_id):
+        """사용자의 갈레온 순위 ({'rank', 'total', 'galleons'}, 없으면 None)"""
+        with self._lock:
+            entry = self._users.get(str(user_id).strip())
+            if entry is None:
+                return None
+            return {
+                'rank': self._rank_of(entry['galleons']),
+                'total': len(self._entries),
+                'galleons': entry['galleons']
+            }
+    
+    def houses(self):
+        """기숙사 점수 합계 순위 ([{'rank', 'house', 'score', 'galleons', 'members'}])"""
+        with self._lock:
+            houses = sorted(
+                ((house, dict(totals)) for house, totals in self._houses.items()),
+                key=lambda kv: (-kv[1]['score'], kv[0])
+            )
+        
+        result = []
+        for index, (house, totals) in enumerate(houses):
+            rank = index + 1
+            if index and totals['score'] == houses[index - 1][1]['score']:
+                rank = result[-1]['rank']
+            result.append({'rank': rank, 'house': house, **totals})
+        return result
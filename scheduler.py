@@ -0,0 +1,174 @@
+# scheduler.py
+# 구글 시트 요청 스케줄러 (토큰 버킷 + 우선순위 + 429/5xx 재시도)
+
+# 구글 시트 API는 사용자당 분당 약 60회로 제한됨.
+# 모든 요청이 토큰 버킷을 거치게 해서 한도를 넘기 전에 스스로 속도를 늦추고,
+# 대기 중인 요청은 우선순위 순서로 보냄 (명령어 응답 > 백그라운드 기록 > 로그)
+
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+import gspread
+
+# 우선순위 (숫자가 작을수록 먼저)
+HIGH = 0     # 명령어 응답에 필요한 읽기, 갈레온/아이템 변경
+NORMAL = 1   # 쓰기 지연 기록, SQLite 미러 등 백그라운드 기록
+LOW = 2      # 로그 추가
+
+PRIORITY_NAMES = {HIGH: '높음', NORMAL: '보통', LOW: '낮음'}
+
+# 재시도할 HTTP 상태 코드
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 지금 실행 중인 작업의 요청 우선순위 (AsyncSheetManager가 스레드 풀까지 전달)
+request_priority = contextvars.ContextVar('request_priority', default=HIGH)
+
+@contextlib.contextmanager
+def priority(level):
+    """with 블록 안의 시트 요청 우선순위 지정"""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+class RequestScheduler:
+    """시트 요청을 토큰 버킷 속도에 맞춰 우선순위 순서로 내보냄"""
+    
+    # 임의의 60초 동안 보낼 수 있는 최대 요청 수는 burst + rate_per_minute 이므로
+    # 둘의 합이 구글 한도(분당 60회)를 넘지 않게 설정
+    
+    def __init__(self, rate_per_minute=50, burst=10, max_retries=5,
+                 base_delay=1.0, max_delay=32.0, metrics=None, warn_queue_depth=20):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.warn_queue_depth = warn_queue_depth
+        
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._last_warning = 0.0
+        
+        self.max_queue_depth = 0
+        self.retries = 0
+        self.throttled = 0
+        
+        if metrics is not None:
+            metrics.add_gauge('rpgbot_sheets_queue_depth', '대기 중인 시트 요청 수', self.queue_depth)
+            metrics.add_gauge('rpgbot_sheets_tokens', '바로 보낼 수 있는 시트 요청 수', self.tokens)
+    
+    def queue_depth(self):
+        """대기 중인 요청 수"""
+        with self._cond:
+            return len(self._waiting)
+    
+    def tokens(self):
+        """지금 남은 토큰 수"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return self._tokens
+    
+    def _refill(self, now):
+        """경과 시간만큼 토큰 충전 (잠금 안에서 호출, 멈춘 동안은 충전하지 않음)"""
+        if now < self._paused_until:
+            self._updated = now
+            return
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def _acquire(self, level):
+        """토큰 1개를 받을 때까지 대기 (우선순위가 높고 먼저 온 요청부터), 대기 시간 반환"""
+        with self._cond:
+            ticket = (level, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            start = time.monotonic()
+            
+            depth = len(self._waiting)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            if depth >= self.warn_queue_depth and start - self._last_warning >= 60:
+                self._last_warning = start
+                print(f"[SCHEDULER WARNING] 시트 요청 대기열 {depth}개 (할당량 포화)")
+            
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                
+                if self._waiting[0] == ticket:
+                    if now < self._paused_until:
+                        self._cond.wait(self._paused_until - now)
+                        continue
+                    if self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        # 다음 순서의 요청이 토큰을 다시 계산하도록 깨움
+                        self._cond.notify_all()
+                        return now - start
+                    self._cond.wait((1 - self._tokens) / self.rate)
+                else:
+                    self._cond.wait()
+    
+    def _pause(self, seconds):
+        """429를 받으면 모든 요청을 잠시 멈춤"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._cond.notify_all()
+    
+    def call(self, func, *args, **kwargs):
+        """func(*args, **kwargs)를 속도 제한 안에서 실행 (429/5xx는 지수 백오프로 재시도)"""
+        level = request_priority.get()
+        attempt = 0
+        while True:
+            waited = self._acquire(level)
+            if self.metrics is not None:
+                self.metrics.record_queue_wait(PRIORITY_NAMES.get(level, str(level)), waited)
+            
+            try:
+                return func(*args, **kwargs)
+            
+            except gspread.exceptions.APIError as e:
+                status = getattr(e.response, 'status_code', None)
+                if status not in RETRY_STATUS or attempt >= self.max_retries:
+                    raise
+                
+                # 지수 백오프 + 지터 (동시에 실패한 요청들이 한꺼번에 재시도하지 않도록)
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay = random.uniform(delay / 2, delay)
+                attempt += 1
+                
+                with self._cond:
+                    self.retries += 1
+                    if status == 429:
+                        self.throttled += 1
+                if self.metrics is not None:
+                    self.metrics.record_retry(status)
+                print(f"[SCHEDULER] 시트 요청 실패({status}), {delay:.1f}초 후 재시도 ({attempt}/{self.max_retries})")
+                
+                if status == 429:
+                    # 할당량 초과는 모든 요청에 해당하므로 버킷 전체를 멈춤
+                    self._pause(delay)
+                else:
+                    time.sleep(delay)
+    
+    def wrap(self, client):
+        """gspread 클라이언트의 모든 요청이 스케줄러를 거치도록 client.request를 감쌈"""
+        request = client.request
+        
+        @functools.wraps(request)
+        def scheduled_request(*args, **kwargs):
+            return self.call(request, *args, **kwargs)
+        
+        client.request = scheduled_request
+        return client
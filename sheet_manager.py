@@ -2,108 +2,533 @@
 # 구글 시트 연동 관리자
 
 import gspread
+from gspread.utils import absolute_range_name, numericise_all, rowcol_to_a1
 from google.oauth2.service_account import Credentials
 from datetime import datetime
-import pytz
+import csv
+import gzip
+import os
+import re
+import threading
+import time
+from log_buffer import LogBuffer
+from log_index import LogIndex
+from journal import Journal
+from inventory import parse_inventory
+from metrics import instrument_client
+from scheduler import LOW, NORMAL, priority
+from sheets_session import SheetsSession
+from single_flight import SingleFlight
+from snapshot import content_hash, load_snapshot, save_snapshot
+from storage import (
+    StorageBackend, KST, USER_FIELDS, to_int, user_key, apply_fields, copy_user, user_updates
+)
 
-class SheetManager:
-    def __init__(self, credentials_file, sheet_id):
+# 시트별 헤더
+SHEET_HEADERS = {
+    '사용자': ['ID', '이름', '갈레온', '아이템', '메모', '기숙사',
+              '마지막베팅날짜', '베팅횟수', '출석날짜', '마지막타로날짜', '기숙사점수'],
+    '아이템': ['아이템명', '설명', '가격', '판매여부', '사용가능여부'],
+    '로그': ['타임스탬프', '사용자', '명령어', '내용']
+}
+
+# 사용자 필드 → 사용자 시트 열 번호
+USER_COLUMNS = {field: col for col, field in enumerate(USER_FIELDS, start=1)}
+
+# 이 필드만 바꾸는 기록은 미뤄 둔 변경으로 모아서 보냄 (늦게 기록돼도 게임에 영향 없음)
+LOW_PRIORITY_FIELDS = {'last_tarot_date'}
+
+# 미룬 사용자 변경 기록이 실패했을 때 다시 시도하기까지 기다리는 시간 (초)
+COALESCE_RETRY_INTERVAL = 30
+
+# 기간별 로그 시트 이름 접두사 (로그_2026-10)
+LOG_PERIOD_PREFIX = '로그_'
+
+# 로그 시트를 비운 뒤 남겨 둘 행 수 (새로 만들 때와 같은 크기)
+LOG_SHEET_ROWS = 100
+
+def _parse_user(record, row):
+    """사용자 시트 레코드를 사용자 딕셔너리로 변환"""
+    return {
+        'row': row,
+        'id': record.get('ID', ''),
+        'name': record.get('이름', ''),
+        'galleons': to_int(record.get('갈레온', 0)),
+        'items': record.get('아이템', ''),
+        # 아이템 칸을 미리 파싱해 둔 {아이템명: 개수}
+        'inventory': parse_inventory(record.get('아이템', '')),
+        'memo': record.get('메모', ''),
+        'house': record.get('기숙사', ''),
+        'last_bet_date': record.get('마지막베팅날짜', ''),
+        'bet_count': to_int(record.get('베팅횟수', 0)),
+        'attendance_date': record.get('출석날짜', ''),
+        'last_tarot_date': record.get('마지막타로날짜', ''),
+        'house_score': to_int(record.get('기숙사점수', 0))
+    }
+
+def _snapshot_user(entry):
+    """스냅샷 항목 [행 번호, ID, 이름, ...] → 사용자 딕셔너리 (_parse_user와 같은 형태)"""
+    user = dict(zip(USER_FIELDS, entry[1:]))
+    user['row'] = entry[0]
+    user['inventory'] = parse_inventory(user.get('items', ''))
+    return user
+
+def _user_entry(user):
+    """사용자 딕셔너리 → 스냅샷 항목"""
+    return [user['row']] + [user[field] for field in USER_FIELDS]
+
+# 아이템 딕셔너리 키 (스냅샷 항목 순서)
+ITEM_FIELDS = ['name', 'description', 'price', 'sellable', 'usable']
+
+def _to_records(values):
+    """헤더가 포함된 시트 값 → get_all_records와 같은 레코드 목록 (숫자 변환 포함)"""
+    if not values:
+        return []
+    
+    keys = values[0]
+    return [
+        dict(zip(keys, numericise_all((list(row) + [''] * len(keys))[:len(keys)])))
+        for row in values[1:]
+    ]
+
+def _parse_item(record):
+    """아이템 시트 레코드를 아이템 딕셔너리로 변환"""
+    return {
+        'name': str(record.get('아이템명', '')).strip(),
+        'description': record.get('설명', ''),
+        'price': to_int(record.get('가격', 0)),
+        'sellable': str(record.get('판매여부', '')).upper() == 'TRUE',
+        'usable': str(record.get('사용가능여부', '')).upper() == 'TRUE'
+    }
+
+def _appended_rows(response):
+    """append_row(s) 응답에서 추가된 첫 행/마지막 행 번호 추출 (모르면 (None, None))"""
+    try:
+        updated_range = response['updates']['updatedRange']
+        match = re.search(r'![A-Z]+(\d+)(?::[A-Z]+(\d+))?', updated_range)
+        if not match:
+            return None, None
+        first = int(match.group(1))
+        return first, int(match.group(2) or first)
+    except (TypeError, KeyError):
+        return None, None
+
+def _appended_row(response):
+    """append_row 응답에서 추가된 행 번호 추출"""
+    return _appended_rows(response)[0]
+
+def _log_period(timestamp):
+    """로그 타임스탬프의 기간 (YYYY-MM, 형식이 다르면 None)"""
+    match = re.match(r'(\d{4}-\d{2})', str(timestamp))
+    return match.group(1) if match else None
+
+def _export_rows(path, rows):
+    """행들을 gzip CSV 파일 끝에 추가 (새 파일이면 헤더 포함)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    exists = os.path.exists(path)
+    # gzip은 이어 붙인 파일도 하나로 읽히므로 기존 파일 뒤에 그대로 추가
+    with gzip.open(path, 'at', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerows(rows[1:] if exists else rows)
+
+def _row_ranges(row, fields):
+    """한 행의 변경 필드를 연속 열 구간별 batch_update 데이터로 변환"""
+    cols = sorted((USER_COLUMNS[k], v) for k, v in fields.items())
+    
+    data = []
+    start = prev = None
+    values = []
+    for col, value in cols:
+        if prev is not None and col == prev + 1:
+            values.append(value)
+        else:
+            if values:
+                data.append({
+                    'range': f'{rowcol_to_a1(row, start)}:{rowcol_to_a1(row, prev)}',
+                    'values': [values]
+                })
+            start = col
+            values = [value]
+        prev = col
+    
+    if values:
+        data.append({
+            'range': f'{rowcol_to_a1(row, start)}:{rowcol_to_a1(row, prev)}',
+            'values': [values]
+        })
+    
+    return data
+
+class SheetManager(StorageBackend):
+    def __init__(self, credentials_file, sheet_id, log_batch_size=20,
+                 log_flush_interval=10.0, log_buffer_size=1000,
+                 write_behind=False, journal_file='sheet_journal.log',
+                 flush_interval=60.0, item_cache_ttl=300.0, client=None, metrics=None,
+                 scheduler=None, log_index_size=50, log_seed_rows=500, log_rotate_rows=5000,
+                 log_rotate_monthly=True, log_archive_sheet_id=None, log_archive_dir='log_archive',
+                 log_keep_periods=6, http_pool_size=10, http_timeout=60.0, snapshot_file=None,
+                 snapshot_interval=300.0, coalesce_window=2.0):
+        super().__init__()
         self.credentials_file = credentials_file
         self.sheet_id = sheet_id
-        self.client = None
+        # client를 넘기면 인증을 건너뛰고 그대로 사용 (fake_sheets.FakeClient 등)
+        self.client = client
+        # metrics.Metrics를 넘기면 모든 Sheets API 요청을 명령어별로 집계
+        self.metrics = metrics
+        # scheduler.RequestScheduler를 넘기면 모든 요청이 할당량에 맞춰 우선순위 순서로 나감
+        self.scheduler = scheduler
+        # 직접 인증할 때 쓰는 keep-alive 세션 (client를 넘기면 None)
+        self.session = None
+        self.http_pool_size = http_pool_size
+        self.http_timeout = http_timeout
         self.spreadsheet = None
+        # 같은 시트/사용자를 동시에 읽으면 진행 중인 읽기 하나의 결과를 나눠 받음 (요청 N개 → API 1회)
+        self._flights = SingleFlight()
+        # 시트 이름 → Worksheet (매번 시트 메타데이터를 읽지 않도록 캐시)
+        self._worksheets = {}
+        self._worksheets_lock = threading.RLock()
+        # 사용자 캐시: ID → 사용자 딕셔너리 (행 번호 포함)
+        self._users = {}
+        self._users_loaded = False
+        self._next_user_row = 2
+        # 명령어들이 스레드 풀에서 동시에 실행되므로 캐시 접근은 잠금으로 보호
+        self._lock = threading.RLock()
+        # 아이템 목록 캐시: 아이템명 → 아이템 (시트 순서 유지), 내용이 바뀔 때마다 버전 증가
+        self._items = {}
+        self._items_lock = threading.Lock()
+        self._items_loaded_at = None
+        self.item_cache_ttl = item_cache_ttl
+        self.catalog_version = 0
+        # 쓰기 지연 모드: 변경은 저널 → 캐시에 즉시 반영, 시트에는 주기적으로 일괄 기록
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._journal = Journal(journal_file) if write_behind else None
+        self._dirty = {}
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        # 미룬 변경(defer_user_updates, 출석 등): 캐시에 바로 반영하고
+        # 첫 변경 후 coalesce_window초 동안 들어온 변경까지 모아 batch_update 한 번으로 기록
+        self.coalesce_window = coalesce_window
+        self._coalesce_wakeup = threading.Event()
+        # 스냅샷: 사용자/아이템 캐시를 snapshot_interval초마다, 그리고 종료할 때 로컬 파일에 저장하고
+        # 시작할 때 바로 불러온 뒤 백그라운드에서 시트를 한 번에 읽어 맞춤
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_hash = None
+        # 맞추기 전에는 행 번호가 바뀌었을 수 있으므로 시트 쓰기가 잠시 기다림
+        self._reconciled = threading.Event()
+        # 로그 시트의 마지막 데이터 행 번호 (None이면 다음 조회 때 A열을 읽어 셈)
+        # 이후로는 append 응답의 updatedRange로 갱신하므로 조회 때 끝부분만 읽으면 됨
+        self._log_rows = None
+        self._log_rows_lock = threading.Lock()
+        # 사용자별 최근 로그 (!기록), 처음 조회할 때 로그 시트 끝 log_seed_rows행으로 채움
+        self._log_index = LogIndex(log_index_size)
+        self._log_index_lock = threading.Lock()
+        self.log_seed_rows = log_seed_rows
+        # 로그 시트가 log_rotate_rows행을 넘거나 달이 바뀌면 기간별 시트로 옮기고 비움
+        # 기간별 시트는 log_archive_sheet_id 스프레드시트(없으면 같은 스프레드시트)에 만들고,
+        # 최근 log_keep_periods개보다 오래된 기간은 log_archive_dir에 gzip CSV로 내보낸 뒤 삭제
+        self.log_rotate_rows = log_rotate_rows
+        self.log_rotate_monthly = log_rotate_monthly
+        self.log_archive_sheet_id = log_archive_sheet_id
+        self.log_archive_dir = log_archive_dir
+        self.log_keep_periods = log_keep_periods
+        # 로그 시트 첫 행의 기간 (로그 시트가 비어 있으면 None)
+        self._log_period = None
+        self._log_archive = None
+        # 기간별 시트 이름 → Worksheet (처음 옮길 때 시트 목록을 읽음)
+        self._log_periods = None
+        self._log_rotate_retry_at = 0.0
         self._connect()
         self._ensure_sheets()
+        # 로그는 모아서 append_rows 한 번으로 기록
+        self._log_buffer = LogBuffer(
+            self._write_log_rows,
+            batch_size=log_batch_size,
+            flush_interval=log_flush_interval,
+            max_size=log_buffer_size
+        )
+        
+        if self.snapshot_file and self._load_snapshot():
+            threading.Thread(target=self._reconcile_loop, name='sheet-reconcile', daemon=True).start()
+        else:
+            self._reconciled.set()
+        
+        if self.write_behind:
+            self._replay_journal()
+            self._flusher = threading.Thread(target=self._flush_loop, name='sheet-flusher', daemon=True)
+            self._flusher.start()
+        else:
+            self._coalescer = threading.Thread(target=self._coalesce_loop, name='sheet-coalescer', daemon=True)
+            self._coalescer.start()
+        
+        if self.snapshot_file:
+            self._snapshotter = threading.Thread(target=self._snapshot_loop, name='sheet-snapshot', daemon=True)
+            self._snapshotter.start()
+    
+    def close(self):
+        """남은 변경 사항과 로그 기록 후 종료"""
+        self._closed.set()
+        if self.write_behind:
+            self._flusher.join()
+        else:
+            self._coalesce_wakeup.set()
+            self._coalescer.join()
+        ok = self.flush_users()
+        if self.write_behind:
+            self._journal.close()
+        ok = self._log_buffer.close() and ok
+        if self.snapshot_file:
+            self._snapshotter.join()
+            self.save_snapshot()
+        if self.session is not None:
+            self.session.close()
+        return ok
     
     def _connect(self):
         """구글 시트 연결"""
         try:
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
+            if self.client is None:
+                scopes = [
+                    'https://www.googleapis.com/auth/spreadsheets',
+                    'https://www.googleapis.com/auth/drive'
+                ]
+                
+                creds = Credentials.from_service_account_file(
+                    self.credentials_file,
+                    scopes=scopes
+                )
+                
+                self.session = SheetsSession(creds, pool_size=self.http_pool_size, timeout=self.http_timeout)
+                self.client = self.session.authorize()
             
-            creds = Credentials.from_service_account_file(
-                self.credentials_file,
-                scopes=scopes
-            )
+            if self.metrics is not None:
+                instrument_client(self.client, self.metrics)
+            if self.scheduler is not None:
+                self.scheduler.wrap(self.client)
             
-            self.client = gspread.authorize(creds)
             self.spreadsheet = self.client.open_by_key(self.sheet_id)
             print(f"[SHEET] 연결 성공: {self.spreadsheet.title}")
-            
+        
         except Exception as e:
             print(f"[SHEET ERROR] 연결 실패: {e}")
+            if self.session is not None:
+                self.session.close()
             raise
     
     def _ensure_sheets(self):
-        """필요한 시트들이 존재하는지 확인하고 없으면 생성"""
-        required_sheets = {
-            '사용자': ['ID', '이름', '갈레온', '아이템', '메모', '기숙사', 
-                      '마지막베팅날짜', '베팅횟수', '출석날짜', '마지막타로날짜', '기숙사점수'],
-            '아이템': ['아이템명', '설명', '가격', '판매여부', '사용가능여부'],
-            '로그': ['타임스탬프', '사용자', '명령어', '내용']
-        }
-        
-        existing_sheets = [ws.title for ws in self.spreadsheet.worksheets()]
-        
-        for sheet_name, headers in required_sheets.items():
-            if sheet_name not in existing_sheets:
-                print(f"[SHEET] '{sheet_name}' 시트 생성 중...")
-                ws = self.spreadsheet.add_worksheet(
-                    title=sheet_name,
-                    rows=100,
-                    cols=len(headers)
-                )
-                ws.append_row(headers)
-                print(f"[SHEET] '{sheet_name}' 시트 생성 완료")
+        """필요한 시트들이 존재하는지 확인하고 없으면 생성 (시트 목록 1회 + 생성 1회 요청)"""
+        with self._worksheets_lock:
+            worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+            missing = [name for name in SHEET_HEADERS if name not in worksheets]
+            
+            if missing:
+                print(f"[SHEET] {', '.join(missing)} 시트 생성 중...")
+                
+                # 새 시트 ID를 직접 지정해 같은 요청 안에서 헤더까지 기록
+                next_id = max([ws.id for ws in worksheets.values()] + [0]) + 1
+                requests = []
+                for offset, sheet_name in enumerate(missing):
+                    headers = SHEET_HEADERS[sheet_name]
+                    sheet_id = next_id + offset
+                    requests.append({
+                        'addSheet': {
+                            'properties': {
+                                'sheetId': sheet_id,
+                                'title': sheet_name,
+                                'gridProperties': {'rowCount': 100, 'columnCount': len(headers)}
+                            }
+                        }
+                    })
+                    requests.append({
+                        'updateCells': {
+                            'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+                            'rows': [{'values': [
+                                {'userEnteredValue': {'stringValue': header}} for header in headers
+                            ]}],
+                            'fields': 'userEnteredValue'
+                        }
+                    })
+                
+                response = self.spreadsheet.batch_update({'requests': requests})
+                
+                for reply in response.get('replies', []):
+                    if 'addSheet' in reply:
+                        properties = reply['addSheet']['properties']
+                        worksheets[properties['title']] = gspread.Worksheet(self.spreadsheet, properties)
+                
+                print(f"[SHEET] {', '.join(missing)} 시트 생성 완료")
+            
+            self._worksheets = worksheets
     
     def get_worksheet(self, sheet_name):
-        """시트 가져오기"""
+        """시트 가져오기 (한 번 찾은 시트는 재사용)"""
+        ws = self._worksheets.get(sheet_name)
+        if ws:
+            return ws
+        
         try:
-            return self.spreadsheet.worksheet(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            print(f"[ERROR] '{sheet_name}' 시트를 찾을 수 없습니다.")
+            # 시트 이름이 바뀌었거나 삭제된 경우 목록을 다시 읽고 필요하면 재생성
+            self._flights.do('worksheets', self._ensure_sheets)
+        except Exception as e:
+            print(f"[ERROR] 시트 목록 새로고침 실패: {e}")
             return None
+        
+        ws = self._worksheets.get(sheet_name)
+        if not ws:
+            print(f"[ERROR] '{sheet_name}' 시트를 찾을 수 없습니다.")
+        return ws
+    
+    def invalidate_worksheets(self, sheet_name=None):
+        """시트 캐시 무효화 (다음 접근 시 시트 목록을 다시 읽음)"""
+        with self._worksheets_lock:
+            if sheet_name is None:
+                self._worksheets = {}
+            else:
+                self._worksheets.pop(sheet_name, None)
+    
+    def _check_sheet_error(self, sheet_name, error):
+        """시트가 없어서 난 오류면 해당 시트 캐시를 버림"""
+        if isinstance(error, gspread.exceptions.WorksheetNotFound) or (
+                isinstance(error, gspread.exceptions.APIError)
+                and 'Unable to parse range' in str(error)):
+            print(f"[SHEET] '{sheet_name}' 시트를 다시 찾습니다.")
+            self.invalidate_worksheets(sheet_name)
     
     # ============================================
     # 사용자 관리
     # ============================================
     
-    def find_user(self, user_id):
-        """사용자 찾기"""
+    def _load_users(self):
+        """사용자 시트 전체를 한 번에 읽어 캐시 구성 (동시에 부르면 읽기 1회를 나눠 받음)"""
+        if self._users_loaded:
+            return True
+        return self._flights.do('users', self._fetch_users)
+    
+    def _fetch_users(self):
+        """_load_users 본체 (시트를 읽는 동안에는 캐시 잠금을 잡지 않음)"""
+        if self._users_loaded:
+            return True
+        
+        ws = self.get_worksheet('사용자')
+        if not ws:
+            return False
+        
+        records = ws.get_all_records()
+        
+        users = {}
+        for idx, record in enumerate(records, start=2):
+            key = user_key(record.get('ID', ''))
+            if key:
+                users[key] = _parse_user(record, idx)
+        
+        with self._lock:
+            self._merge_dirty(users)
+            self._users = users
+            self._next_user_row = len(records) + 2
+            self._users_loaded = True
+            self.ranking.rebuild(users.values())
+            print(f"[CACHE] 사용자 {len(users)}명 로드 완료")
+            return True
+    
+    def _merge_dirty(self, users):
+        """아직 시트에 기록되지 않은 변경을 새로 읽은 사용자 위에 다시 반영 (잠금 안에서 호출)"""
+        for key, fields in self._dirty.items():
+            cached, fresh = self._users.get(key), users.get(key)
+            if cached and fresh:
+                apply_fields(fresh, {field: cached[field] for field in fields})
+    
+    def invalidate_users(self, user_id=None):
+        """사용자 캐시 무효화 (user_id 지정 시 해당 행만 다시 읽음)"""
+        if not self._wait_reconciled():
+            return False
+        # 아직 시트에 기록되지 않은 변경이 있으면 먼저 기록
+        if not self.flush_users():
+            return False
+        
+        with self._lock:
+            if user_id is None or not self._users_loaded:
+                self._users = {}
+                self._users_loaded = False
+                self.ranking.clear()
+                return True
+            
+            key = user_key(user_id)
+            user = self._users.get(key)
+            if not user:
+                # 시트에 직접 추가된 사용자일 수 있으므로 전체 재로드
+                self._users_loaded = False
+                self.ranking.clear()
+                return True
+        
         try:
             ws = self.get_worksheet('사용자')
             if not ws:
-                return None
+                return False
             
-            records = ws.get_all_records()
-            
-            for idx, record in enumerate(records, start=2):
-                if str(record.get('ID', '')).strip() == str(user_id).strip():
-                    return {
-                        'row': idx,
-                        'id': record.get('ID', ''),
-                        'name': record.get('이름', ''),
-                        'galleons': int(record.get('갈레온', 0)),
-                        'items': record.get('아이템', ''),
-                        'memo': record.get('메모', ''),
-                        'house': record.get('기숙사', ''),
-                        'last_bet_date': record.get('마지막베팅날짜', ''),
-                        'bet_count': int(record.get('베팅횟수', 0)),
-                        'attendance_date': record.get('출석날짜', ''),
-                        'last_tarot_date': record.get('마지막타로날짜', ''),
-                        'house_score': int(record.get('기숙사점수', 0))
-                    }
+            record = self._flights.do(('user_row', user['row']), self._read_user_row, ws, user['row'])
             
-            return None
+            with self._lock:
+                if user_key(record.get('ID', '')) != key:
+                    # 행이 이동/삭제된 경우 전체 재로드
+                    self._users_loaded = False
+                    self.ranking.clear()
+                    return True
+                
+                self._users[key] = _parse_user(record, user['row'])
+                self.ranking.update(self._users[key])
+            return True
+        
+        except Exception as e:
+            print(f"[ERROR] invalidate_users 실패: {e}")
+            self._check_sheet_error('사용자', e)
+            self._users_loaded = False
+            self.ranking.clear()
+            return False
+    
+    def _read_user_row(self, ws, row):
+        """사용자 시트 한 행을 헤더와 묶어 읽음"""
+        headers = ws.row_values(1)
+        values = ws.row_values(row)
+        return dict(zip(headers, values))
+    
+    def find_user(self, user_id):
+        """사용자 찾기"""
+        try:
+            if not self._users_loaded and not self._load_users():
+                return None
             
+            with self._lock:
+                user = self._users.get(user_key(user_id))
+                return copy_user(user) if user else None
+        
         except Exception as e:
             print(f"[ERROR] find_user 실패: {e}")
+            self._check_sheet_error('사용자', e)
             return None
     
+    def get_all_users(self):
+        """등록된 모든 사용자 (시트 순서)"""
+        try:
+            if not self._users_loaded and not self._load_users():
+                return []
+            
+            with self._lock:
+                users = sorted(self._users.values(), key=lambda user: user['row'])
+                return [copy_user(user) for user in users]
+        
+        except Exception as e:
+            print(f"[ERROR] get_all_users 실패: {e}")
+            self._check_sheet_error('사용자', e)
+            return []
+    
     def create_user(self, user_id, name, initial_galleons=100):
         """새 사용자 생성"""
+        if not self._wait_reconciled():
+            return False
         try:
             ws = self.get_worksheet('사용자')
             if not ws:
@@ -123,180 +548,701 @@ class SheetManager:
                 0
             ]
             
-            ws.append_row(row)
+            response = ws.append_row(row)
+            
+            with self._lock:
+                if self._users_loaded:
+                    row_number = _appended_row(response) or self._next_user_row
+                    record = dict(zip(SHEET_HEADERS['사용자'], row))
+                    self._users[user_key(user_id)] = _parse_user(record, row_number)
+                    self.ranking.update(self._users[user_key(user_id)])
+                    self._next_user_row = max(self._next_user_row, row_number + 1)
+            
             print(f"[USER] 새 사용자 생성: {name} (ID: {user_id})")
             return True
-            
+        
         except Exception as e:
             print(f"[ERROR] create_user 실패: {e}")
+            self._check_sheet_error('사용자', e)
+            self.invalidate_users()
             return False
     
-    def update_user(self, user_id, updates):
-        """사용자 정보 업데이트"""
+    def update_users(self, updates_by_user):
+        """여러 사용자 정보를 한 번의 요청으로 업데이트 ({user_id: updates})"""
+        if self.write_behind:
+            return self._journal_user_updates(updates_by_user)
+        if all(set(user_updates(updates)) <= LOW_PRIORITY_FIELDS for updates in updates_by_user.values()):
+            # 시트가 바쁠 때 명령어 스레드가 낮은 우선순위 대기열에서 기다리지 않도록
+            # 캐시에만 반영하고 기록은 백그라운드(_coalesce_loop)에 맡김
+            return self.defer_user_updates(updates_by_user)
+        
+        # 바로 시트에 쓰는 경우 스냅샷의 행 번호가 시트와 맞을 때까지 기다림
+        if not self._wait_reconciled():
+            return False
         try:
-            user = self.find_user(user_id)
-            if not user:
+            if not self._users_loaded and not self._load_users():
                 return False
             
-            ws = self.get_worksheet('사용자')
-            row = user['row']
-            
-            col_map = {
-                'id': 1, 'name': 2, 'galleons': 3, 'items': 4,
-                'memo': 5, 'house': 6, 'last_bet_date': 7,
-                'bet_count': 8, 'attendance_date': 9,
-                'last_tarot_date': 10, 'house_score': 11
-            }
+            # 미룬 변경의 일괄 기록(flush_users)과 겹치지 않게 함: 진행 중인 일괄 기록이
+            # 이전 캐시 값을 이 기록보다 늦게 시트에 덮어쓰면 변경이 사라짐
+            with self._flush_lock:
+                data = []
+                changes = []
+                missing = False
+                
+                with self._lock:
+                    for user_id, updates in updates_by_user.items():
+                        cached = self._users.get(user_key(user_id))
+                        if not cached:
+                            missing = True
+                            continue
+                        
+                        fields = user_updates(updates)
+                        if not fields:
+                            continue
+                        
+                        data.extend(_row_ranges(cached['row'], fields))
+                        changes.append((cached, fields))
+                
+                if data:
+                    ws = self.get_worksheet('사용자')
+                    if not ws:
+                        return False
+                    
+                    ws.batch_update(data, value_input_option='USER_ENTERED')
+                    
+                    with self._lock:
+                        for cached, fields in changes:
+                            apply_fields(cached, fields)
+                            self.ranking.apply(cached['id'], fields)
+                            # 방금 기록한 필드는 미룬 변경에서 뺌 (남은 필드만 다음 일괄 기록에서)
+                            key = user_key(cached['id'])
+                            dirty = self._dirty.get(key)
+                            if dirty is not None:
+                                dirty.difference_update(fields)
+                                if not dirty:
+                                    del self._dirty[key]
             
-            for key, value in updates.items():
-                if key in col_map:
-                    col = col_map[key]
-                    ws.update_cell(row, col, value)
+            for cached, fields in changes:
+                print(f"[USER] 업데이트 완료: {cached['id']}")
+            return not missing
+        
+        except Exception as e:
+            print(f"[ERROR] update_users 실패: {e}")
+            self._check_sheet_error('사용자', e)
+            for user_id in updates_by_user:
+                self.invalidate_users(user_id)
+            return False
+    
+    def _journal_user_updates(self, updates_by_user):
+        """쓰기 지연 모드: 저널에 먼저 남긴 뒤 캐시에 반영 (시트 기록은 flush_users에서)"""
+        try:
+            if not self._users_loaded and not self._load_users():
+                return False
             
-            print(f"[USER] 업데이트 완료: {user_id}")
-            return True
+            missing = False
+            with self._lock:
+                for user_id, updates in updates_by_user.items():
+                    cached = self._users.get(user_key(user_id))
+                    if not cached:
+                        missing = True
+                        continue
+                    
+                    fields = user_updates(updates)
+                    if fields:
+                        self._journal.append(user_id, fields)
+                        self._apply_deferred(cached, fields)
             
+            return not missing
+        
         except Exception as e:
-            print(f"[ERROR] update_user 실패: {e}")
+            print(f"[ERROR] update_users 실패: {e}")
+            self._check_sheet_error('사용자', e)
+            return False
+    
+    def defer_user_updates(self, updates_by_user):
+        """캐시에 바로 반영하고 시트에는 coalesce_window초 동안 모은 변경을 한 번에 기록"""
+        # 쓰기 지연 모드에서는 update_users가 이미 저널에 남기고 모아서 기록함
+        if self.write_behind:
+            return self.update_users(updates_by_user)
+        
+        if not self._users_loaded and not self._load_users():
             return False
+        
+        missing = False
+        with self._lock:
+            for user_id, updates in updates_by_user.items():
+                cached = self._users.get(user_key(user_id))
+                if not cached:
+                    missing = True
+                    continue
+                
+                fields = user_updates(updates)
+                if fields:
+                    self._apply_deferred(cached, fields)
+        
+        self._coalesce_wakeup.set()
+        return not missing
+    
+    def _apply_deferred(self, cached, fields):
+        """캐시에 반영하고 다음 flush_users에서 기록할 필드로 표시 (잠금 안에서 호출)"""
+        apply_fields(cached, fields)
+        self.ranking.apply(cached['id'], fields)
+        self._dirty.setdefault(user_key(cached['id']), set()).update(fields)
+    
+    def _coalesce_loop(self):
+        """미룬 변경이 생기면 coalesce_window초 더 모은 뒤 기록 (실패하면 잠시 후 다시 시도)"""
+        while not self._closed.is_set():
+            self._coalesce_wakeup.wait()
+            self._closed.wait(self.coalesce_window)
+            self._coalesce_wakeup.clear()
+            if self._closed.is_set():
+                break
+            if not self.flush_users():
+                self._closed.wait(COALESCE_RETRY_INTERVAL)
+                self._coalesce_wakeup.set()
+    
+    def _ensure_ranking(self):
+        """순위 인덱스는 사용자 캐시를 읽을 때 함께 구성됨"""
+        # 다른 스레드의 사용자 시트 읽기를 기다릴 수 있으므로 잠금 밖에서 로드
+        if not self._users_loaded:
+            self._load_users()
+            return
+        
+        with self._lock:
+            if not self.ranking.loaded:
+                self.ranking.rebuild(self._users.values())
+    
+    def flush_users(self):
+        """쓰기 지연 모드나 defer_user_updates로 미룬 사용자 행을 한 번에 기록"""
+        if not self._dirty:
+            return True
+        
+        # 맞추기 전에는 기록하지 않음 (변경은 남겨 두고 다음에 다시 시도)
+        if not self._wait_reconciled():
+            return False
+        # 스냅샷 캐시를 버린 뒤라면 시트의 행 번호를 먼저 읽음
+        if not self._users_loaded and not self._load_users():
+            return False
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return True
+                
+                dirty = self._dirty
+                self._dirty = {}
+                upto_seq = self._journal.seq if self.write_behind else None
+                
+                data = []
+                for key, fields in dirty.items():
+                    cached = self._users.get(key)
+                    if cached:
+                        data.extend(_row_ranges(cached['row'], {f: cached[f] for f in fields}))
+            
+            try:
+                if data:
+                    ws = self.get_worksheet('사용자')
+                    if not ws:
+                        raise RuntimeError("'사용자' 시트를 찾을 수 없습니다.")
+                    
+                    with priority(NORMAL):
+                        ws.batch_update(data, value_input_option='USER_ENTERED')
+                
+                if self.write_behind:
+                    self._journal.compact(upto_seq)
+                print(f"[USER] 변경된 사용자 {len(dirty)}명 기록 완료")
+                return True
+            
+            except Exception as e:
+                print(f"[ERROR] flush_users 실패: {e}")
+                self._check_sheet_error('사용자', e)
+                with self._lock:
+                    # 다음 기록 때 다시 시도
+                    for key, fields in dirty.items():
+                        self._dirty.setdefault(key, set()).update(fields)
+                return False
+    
+    def _flush_loop(self):
+        """flush_interval초마다 변경된 사용자 기록"""
+        while not self._closed.wait(self.flush_interval):
+            self.flush_users()
+    
+    def _replay_journal(self):
+        """시트에 기록되지 못한 저널 항목을 캐시에 다시 반영"""
+        entries = self._journal.read()
+        if not entries:
+            return
+        
+        if not self._load_users():
+            raise RuntimeError('저널 재적용을 위한 사용자 시트 로드 실패')
+        
+        with self._lock:
+            for entry in entries:
+                key = user_key(entry.get('id', ''))
+                cached = self._users.get(key)
+                if not cached:
+                    print(f"[JOURNAL WARNING] 시트에 없는 사용자 항목을 건너뜁니다: {key}")
+                    continue
+                
+                fields = user_updates(entry.get('updates', {}))
+                apply_fields(cached, fields)
+                self.ranking.apply(key, fields)
+                self._dirty.setdefault(key, set()).update(fields)
+        
+        print(f"[JOURNAL] 저널 {len(entries)}개 재적용")
+        self.flush_users()
     
     # ============================================
     # 아이템 관리
     # ============================================
     
+    def _load_items(self, force=False):
+        """아이템 시트를 한 번에 읽어 캐시 구성 (TTL이 지났거나 force일 때만)"""
+        if (not force and self._items_loaded_at is not None
+                and time.monotonic() - self._items_loaded_at < self.item_cache_ttl):
+            return True
+        # 이미 읽는 중이면 (force여도) 그 결과를 나눠 받음
+        return self._flights.do('items', self._fetch_items)
+    
+    def _fetch_items(self):
+        """_load_items 본체"""
+        ws = self.get_worksheet('아이템')
+        if not ws:
+            return False
+        
+        items = {}
+        for record in ws.get_all_records():
+            item = _parse_item(record)
+            if item['name']:
+                items[item['name']] = item
+        
+        with self._items_lock:
+            if items != self._items:
+                # 캐시는 통째로 교체만 하므로 읽을 때는 잠금이 필요 없음
+                self._items = items
+                self.catalog_version += 1
+                print(f"[CACHE] 아이템 {len(items)}개 로드 완료 (버전 {self.catalog_version})")
+            
+            self._items_loaded_at = time.monotonic()
+            return True
+    
+    def reload_items(self):
+        """아이템 캐시 강제 새로고침"""
+        try:
+            return self._load_items(force=True)
+        except Exception as e:
+            print(f"[ERROR] reload_items 실패: {e}")
+            self._check_sheet_error('아이템', e)
+            return False
+    
+    def get_catalog_version(self):
+        """현재 아이템 목록 버전 (목록이 바뀔 때마다 증가)"""
+        try:
+            self._load_items()
+        except Exception as e:
+            print(f"[ERROR] get_catalog_version 실패: {e}")
+            self._check_sheet_error('아이템', e)
+        return self.catalog_version
+    
     def find_item(self, item_name):
         """아이템 정보 찾기"""
         try:
-            ws = self.get_worksheet('아이템')
-            if not ws:
+            if not self._load_items():
                 return None
             
-            records = ws.get_all_records()
-            
-            for record in records:
-                if record.get('아이템명', '').strip() == item_name.strip():
-                    return {
-                        'name': record.get('아이템명', ''),
-                        'description': record.get('설명', ''),
-                        'price': int(record.get('가격', 0)),
-                        'sellable': str(record.get('판매여부', '')).upper() == 'TRUE',
-                        'usable': str(record.get('사용가능여부', '')).upper() == 'TRUE'
-                    }
-            
-            return None
-            
+            item = self._items.get(str(item_name).strip())
+            return dict(item) if item else None
+        
         except Exception as e:
             print(f"[ERROR] find_item 실패: {e}")
+            self._check_sheet_error('아이템', e)
             return None
     
     def get_all_items(self, sellable_only=False):
         """모든 아이템 목록 가져오기"""
         try:
-            ws = self.get_worksheet('아이템')
-            if not ws:
+            if not self._load_items():
                 return []
             
-            records = ws.get_all_records()
-            items = []
-            
-            for record in records:
-                item = {
-                    'name': record.get('아이템명', ''),
-                    'description': record.get('설명', ''),
-                    'price': int(record.get('가격', 0)),
-                    'sellable': str(record.get('판매여부', '')).upper() == 'TRUE',
-                    'usable': str(record.get('사용가능여부', '')).upper() == 'TRUE'
-                }
-                
-                if sellable_only and not item['sellable']:
-                    continue
-                
-                items.append(item)
-            
-            return items
-            
+            return [
+                dict(item) for item in self._items.values()
+                if item['sellable'] or not sellable_only
+            ]
+        
         except Exception as e:
             print(f"[ERROR] get_all_items 실패: {e}")
+            self._check_sheet_error('아이템', e)
             return []
     
-    def add_item_to_user(self, user_id, item_name):
-        """사용자에게 아이템 추가"""
-        user = self.find_user(user_id)
-        if not user:
-            return False
+    # ============================================
+    # 로그
+    # ============================================
+    
+    def log_message(self, user, command, content):
+        """로그 기록 (버퍼에 넣고 바로 반환, 기록은 백그라운드에서 일괄 처리)"""
+        timestamp = datetime.now(KST).strftime('%Y-%m-%d %H:%M:%S')
         
-        items = user['items'].split(',') if user['items'] else []
-        items = [i.strip() for i in items if i.strip()]
-        items.append(item_name)
+        row = [timestamp, str(user), str(command), str(content)]
+        with self._log_index_lock:
+            self._log_buffer.add(row)
+            self._log_index.add(row)
         
-        return self.update_user(user_id, {'items': ','.join(items)})
+        return True
     
-    def remove_item_from_user(self, user_id, item_name):
-        """사용자에게서 아이템 제거"""
-        user = self.find_user(user_id)
-        if not user:
-            return False
+    def _write_log_rows(self, rows):
+        """버퍼에 쌓인 로그를 한 번에 기록"""
+        ws = self.get_worksheet('로그')
+        if not ws:
+            raise RuntimeError("'로그' 시트를 찾을 수 없습니다.")
         
-        items = user['items'].split(',') if user['items'] else []
-        items = [i.strip() for i in items if i.strip()]
+        try:
+            with priority(LOW):
+                if self._should_rotate_logs(ws, rows):
+                    self._rotate_logs(ws)
+                response = ws.append_rows(rows)
+        except Exception as e:
+            self._check_sheet_error('로그', e)
+            with self._log_rows_lock:
+                self._log_rows = None
+            raise
         
-        if item_name in items:
-            items.remove(item_name)
-            return self.update_user(user_id, {'items': ','.join(items)})
+        with self._log_rows_lock:
+            # 응답에서 마지막 행을 못 찾으면 다음 조회 때 다시 셈
+            first, self._log_rows = _appended_rows(response)
+            if first == 2 or self._log_period is None:
+                self._log_period = _log_period(rows[0][0])
+    
+    def _log_row_count(self, ws):
+        """로그 시트의 마지막 데이터 행 번호 (헤더 포함)"""
+        with self._log_rows_lock:
+            if self._log_rows is None:
+                column = ws.col_values(1)
+                self._log_rows = len(column)
+                self._log_period = _log_period(column[1]) if len(column) > 1 else None
+            return self._log_rows
+    
+    def _read_log_tail(self, ws, count):
+        """로그 시트 끝에서 count행만 읽음 (오래된 순, [타임스탬프, 사용자, 명령어, 내용])"""
+        end = self._log_row_count(ws)
+        start = max(2, end - count + 1)
+        if end < start:
+            return []
         
-        return False
+        values = ws.get(f'A{start}:D{end}')
+        return [(list(row) + [''] * 4)[:4] for row in values if any(row)]
+    
+    def flush_logs(self):
+        """버퍼에 쌓인 로그 즉시 기록"""
+        return self._log_buffer.flush()
+    
+    def get_recent_logs(self, limit=10):
+        """최근 로그 조회"""
+        try:
+            self.flush_logs()
+            
+            ws = self.get_worksheet('로그')
+            if not ws:
+                return []
+            
+            headers = SHEET_HEADERS['로그']
+            rows = self._flights.do(('log_tail', limit), self._read_log_tail, ws, limit)
+            recent = [dict(zip(headers, row)) for row in rows]
+            recent.reverse()
+            
+            return recent
+        
+        except Exception as e:
+            print(f"[LOG ERROR] {e}")
+            self._check_sheet_error('로그', e)
+            with self._log_rows_lock:
+                self._log_rows = None
+            return []
     
-    def get_user_items(self, user_id):
-        """사용자 아이템 목록"""
-        user = self.find_user(user_id)
-        if not user:
-            return {}
+    def _seed_log_index(self):
+        """로그 시트 끝부분 + 아직 기록되지 않은 로그로 사용자별 인덱스 구성"""
+        ws = self.get_worksheet('로그')
+        if not ws:
+            return False
+        
+        # 읽는 동안 버퍼가 기록되면 같은 행이 빠지거나 두 번 들어가므로 기록을 잠시 멈춤
+        with self._log_buffer.hold():
+            rows = self._read_log_tail(ws, self.log_seed_rows)
+            if len(rows) < self.log_seed_rows:
+                # 로그 시트를 막 비웠다면 가장 최근 기간별 시트에서 나머지를 채움
+                rows = self._read_period_tail(self.log_seed_rows - len(rows)) + rows
+            with self._log_index_lock:
+                self._log_index.reset(rows + self._log_buffer.pending())
         
-        items = user['items'].split(',') if user['items'] else []
-        items = [i.strip() for i in items if i.strip()]
+        print(f"[CACHE] 최근 로그 {len(rows)}개로 사용자별 기록 구성")
+        return True
+    
+    def get_user_logs(self, user_name, limit=10):
+        """사용자의 최근 로그 조회 (시트를 훑지 않고 사용자별 인덱스에서)"""
+        try:
+            if not self._log_index.seeded:
+                self._flights.do('log_seed', self._seed_log_index)
         
-        item_counts = {}
-        for item in items:
-            item_counts[item] = item_counts.get(item, 0) + 1
+        except Exception as e:
+            # 시트를 못 읽어도 이번 실행 중에 남긴 로그는 보여줌
+            print(f"[LOG ERROR] {e}")
+            self._check_sheet_error('로그', e)
+            with self._log_rows_lock:
+                self._log_rows = None
         
-        return item_counts
+        return self._log_index.recent(user_name, limit)
     
     # ============================================
-    # 로그
+    # 로그 시트 교체 (기간별 시트 / 로컬 압축 파일)
     # ============================================
     
-    def log_message(self, user, command, content):
-        """로그 기록"""
+    def _should_rotate_logs(self, ws, rows):
+        """로그 시트를 비울 때가 됐는지 (행 수 또는 기간 기준)"""
+        if not (self.log_rotate_rows or self.log_rotate_monthly):
+            return False
+        if time.monotonic() < self._log_rotate_retry_at:
+            return False
+        
+        count = self._log_row_count(ws) - 1
+        if count <= 0:
+            return False
+        if self.log_rotate_rows and count + len(rows) > self.log_rotate_rows:
+            return True
+        return (self.log_rotate_monthly and self._log_period is not None
+                and self._log_period != _log_period(rows[-1][0]))
+    
+    def _get_log_archive(self):
+        """기간별 로그 시트를 만들 스프레드시트"""
+        if self._log_archive is None:
+            if self.log_archive_sheet_id:
+                self._log_archive = self.client.open_by_key(self.log_archive_sheet_id)
+            else:
+                self._log_archive = self.spreadsheet
+        return self._log_archive
+    
+    def _get_log_periods(self):
+        """기간별 로그 시트 목록 (시트 이름 → Worksheet)"""
+        if self._log_periods is None:
+            self._log_periods = {
+                ws.title: ws for ws in self._get_log_archive().worksheets()
+                if ws.title.startswith(LOG_PERIOD_PREFIX)
+            }
+        return self._log_periods
+    
+    def _append_period_rows(self, period, rows):
+        """기간별 로그 시트 끝에 추가 (없으면 헤더와 함께 생성)"""
+        title = f'{LOG_PERIOD_PREFIX}{period}'
+        periods = self._get_log_periods()
+        
+        ws = periods.get(title)
+        if ws is None:
+            headers = SHEET_HEADERS['로그']
+            ws = self._get_log_archive().add_worksheet(title, rows=len(rows) + 1, cols=len(headers))
+            periods[title] = ws
+            rows = [headers] + rows
+        
+        ws.append_rows(rows)
+    
+    def _read_period_tail(self, count):
+        """가장 최근 기간별 로그 시트 끝에서 count행만 읽음"""
+        periods = self._get_log_periods()
+        if not periods:
+            return []
+        
+        ws = periods[max(periods)]
+        end = len(ws.col_values(1))
+        start = max(2, end - count + 1)
+        if end < start:
+            return []
+        
+        return [(list(row) + [''] * 4)[:4] for row in ws.get(f'A{start}:D{end}') if any(row)]
+    
+    def _rotate_logs(self, ws):
+        """로그 시트 내용을 기간별 시트로 옮기고 로그 시트를 비움 (로그 기록 스레드에서 호출)"""
         try:
-            ws = self.get_worksheet('로그')
-            if not ws:
-                return False
+            end = self._log_row_count(ws)
+            fallback = datetime.now(KST).strftime('%Y-%m')
             
-            kst = pytz.timezone('Asia/Seoul')
-            timestamp = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
+            by_period = {}
+            for row in ws.get(f'A2:D{end}'):
+                if any(row):
+                    row = (list(row) + [''] * 4)[:4]
+                    by_period.setdefault(_log_period(row[0]) or fallback, []).append(row)
             
-            row = [timestamp, str(user), str(command), str(content)]
-            ws.append_row(row)
+            for period, period_rows in sorted(by_period.items()):
+                self._append_period_rows(period, period_rows)
             
-            return True
+            # 옮긴 뒤에만 비우므로 중간에 실패해도 로그가 사라지지 않음 (다음에 다시 옮김)
+            self.spreadsheet.values_clear(absolute_range_name(ws.title, f'A2:D{end}'))
+            ws.resize(rows=LOG_SHEET_ROWS)
+            
+            with self._log_rows_lock:
+                self._log_rows = 1
+                self._log_period = None
             
+            moved = sum(len(period_rows) for period_rows in by_period.values())
+            print(f"[LOG] 로그 {moved}개를 기간별 시트({', '.join(sorted(by_period))})로 옮겼습니다.")
+        
         except Exception as e:
-            print(f"[LOG ERROR] {e}")
+            print(f"[LOG ERROR] 로그 시트 교체 실패: {e}")
+            self._log_periods = None
+            # 시트 장애 중에 로그를 기록할 때마다 교체를 다시 시도하지 않도록 잠시 미룸
+            self._log_rotate_retry_at = time.monotonic() + 300
             return False
+        
+        self._export_old_periods()
+        return True
     
-    def get_recent_logs(self, limit=10):
-        """최근 로그 조회"""
+    def _export_old_periods(self):
+        """최근 log_keep_periods개보다 오래된 기간별 시트를 로컬 gzip CSV로 내보내고 삭제"""
+        if not self.log_keep_periods:
+            return
+        
+        periods = self._get_log_periods()
+        for title in sorted(periods)[:-self.log_keep_periods]:
+            try:
+                ws = periods[title]
+                rows = ws.get_all_values()
+                path = os.path.join(self.log_archive_dir, f'{title}.csv.gz')
+                _export_rows(path, rows)
+                
+                self._get_log_archive().del_worksheet(ws)
+                del periods[title]
+                print(f"[LOG] '{title}' 시트 {max(len(rows) - 1, 0)}행을 {path}로 내보내고 삭제했습니다.")
+            
+            except Exception as e:
+                print(f"[LOG ERROR] '{title}' 시트 내보내기 실패: {e}")
+                self._log_periods = None
+                return
+    
+    # ============================================
+    # 스냅샷 (재시작 직후 바로 쓰는 로컬 캐시)
+    # ============================================
+    
+    def _wait_reconciled(self, timeout=10.0):
+        """스냅샷을 시트와 맞출 때까지 최대 timeout초 대기 (시간 안에 못 맞추면 False, 그동안 시트에 쓰지 않음)"""
+        # 스냅샷의 행 번호는 시트가 정렬/삭제되면 다른 사용자의 행을 가리킬 수 있으므로
+        # 시간이 지났다고 확인하지 않은 행 번호로 쓰면 안 됨
+        if self._reconciled.wait(timeout):
+            return True
+        print("[SNAPSHOT] 스냅샷을 아직 시트와 맞추지 못해 시트 쓰기를 미룹니다.")
+        return False
+    
+    def _load_snapshot(self):
+        """스냅샷 파일로 사용자/아이템 캐시 구성 (시트 요청 없음)"""
+        snapshot = load_snapshot(self.snapshot_file, self.sheet_id)
+        if snapshot is None:
+            return False
+        
+        users = {}
+        for entry in snapshot['users']:
+            user = _snapshot_user(entry)
+            key = user_key(user['id'])
+            if key:
+                users[key] = user
+        items = {entry[0]: dict(zip(ITEM_FIELDS, entry)) for entry in snapshot['items']}
+        
+        with self._lock:
+            self._users = users
+            self._next_user_row = snapshot['next_user_row']
+            self._users_loaded = True
+            self.ranking.rebuild(users.values())
+        with self._items_lock:
+            self._items = items
+            self.catalog_version += 1
+            self._items_loaded_at = time.monotonic()
+        
+        self._snapshot_hash = snapshot['hash']
+        saved_at = datetime.fromtimestamp(snapshot['saved_at'], KST).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[SNAPSHOT] 사용자 {len(users)}명, 아이템 {len(items)}개 로드 ({saved_at} 저장)")
+        return True
+    
+    def _reconcile(self):
+        """사용자/아이템 시트를 요청 한 번으로 읽어 스냅샷으로 만든 캐시를 시트 내용으로 교체"""
+        response = self.spreadsheet.values_batch_get([
+            absolute_range_name('사용자'),
+            absolute_range_name('아이템')
+        ])
+        user_values, item_values = [vr.get('values', []) for vr in response['valueRanges']]
+        
+        user_records = _to_records(user_values)
+        users = {}
+        for idx, record in enumerate(user_records, start=2):
+            key = user_key(record.get('ID', ''))
+            if key:
+                users[key] = _parse_user(record, idx)
+        
+        items = {}
+        for record in _to_records(item_values):
+            item = _parse_item(record)
+            if item['name']:
+                items[item['name']] = item
+        
+        fresh_hash = content_hash(
+            [_user_entry(user) for user in sorted(users.values(), key=lambda user: user['row'])],
+            [[item[field] for field in ITEM_FIELDS] for item in items.values()]
+        )
+        
+        with self._lock:
+            # 쓰기 지연 모드나 미룬 변경 중 아직 시트에 기록되지 않은 것은 새로 읽은 값 위에 다시 반영
+            self._merge_dirty(users)
+            self._users = users
+            self._next_user_row = len(user_records) + 2
+            self._users_loaded = True
+            self.ranking.rebuild(users.values())
+        
+        with self._items_lock:
+            if items != self._items:
+                self._items = items
+                self.catalog_version += 1
+            self._items_loaded_at = time.monotonic()
+        
+        if fresh_hash == self._snapshot_hash:
+            print("[SNAPSHOT] 스냅샷이 시트와 같습니다.")
+        else:
+            print(f"[SNAPSHOT] 시트에서 바뀐 내용을 반영했습니다. (사용자 {len(users)}명, 아이템 {len(items)}개)")
+    
+    def _reconcile_loop(self):
+        """시작 직후 백그라운드에서 스냅샷을 시트와 맞춤 (실패하면 스냅샷 사용자 캐시를 버림)"""
         try:
-            ws = self.get_worksheet('로그')
-            if not ws:
-                return []
+            self._reconcile()
+        except Exception as e:
+            print(f"[SNAPSHOT ERROR] 시트와 맞추기 실패, 스냅샷 사용자 캐시를 버립니다: {e}")
+            with self._lock:
+                # 확인하지 못한 행 번호로 쓰지 않도록 다음 요청에서 _load_users로 시트를 다시 읽음
+                # (_users는 남겨 두어 아직 기록되지 않은 변경을 새로 읽은 값 위에 다시 반영)
+                self._users_loaded = False
+                self.ranking.clear()
+        finally:
+            self._reconciled.set()
+    
+    def save_snapshot(self):
+        """사용자/아이템 캐시를 스냅샷 파일로 저장 (바뀐 내용이 없으면 건너뜀)"""
+        if not self.snapshot_file:
+            return True
+        
+        try:
+            with self._lock:
+                if not self._users_loaded:
+                    return True
+                users = [_user_entry(user) for user in sorted(self._users.values(), key=lambda user: user['row'])]
+                next_user_row = self._next_user_row
             
-            records = ws.get_all_records()
-            recent = records[-limit:] if len(records) > limit else records
-            recent.reverse()
+            if self._items_loaded_at is None:
+                return True
+            items = [[item[field] for field in ITEM_FIELDS] for item in self._items.values()]
             
-            return recent
+            if content_hash(users, items) == self._snapshot_hash:
+                return True
             
+            self._snapshot_hash = save_snapshot(self.snapshot_file, self.sheet_id, users, items, next_user_row)
+            print(f"[SNAPSHOT] 사용자 {len(users)}명, 아이템 {len(items)}개 저장")
+            return True
+        
         except Exception as e:
-            print(f"[LOG ERROR] {e}")
-            return []
+            print(f"[SNAPSHOT ERROR] 스냅샷 저장 실패: {e}")
+            return False
+    
+    def _snapshot_loop(self):
+        """snapshot_interval초마다 스냅샷 저장"""
+        while not self._closed.wait(self.snapshot_interval):
+            self.save_snapshot()
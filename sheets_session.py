@@ -0,0 +1,124 @@
+# sheets_session.py
+# 구글 시트용 HTTP 세션 (keep-alive 연결 풀 + 인증 토큰 미리 갱신 + 연결 오류 시 세션 재생성)
+
+# gspread.authorize는 기본 설정의 세션 하나를 만들고 끝이라서
+# 토큰이 만료되면 그 다음 요청이 토큰 갱신을 기다리고, 연결이 끊기면 계속 실패함.
+# 여기서는 세션을 직접 만들어 연결을 재사용하고, 만료 전에 백그라운드에서 토큰을 갱신함
+
+import functools
+import threading
+from datetime import datetime, timezone
+import gspread
+import requests
+from google.auth.exceptions import TransportError
+from google.auth.transport.requests import AuthorizedSession, Request
+from requests.adapters import HTTPAdapter
+
+# 세션을 새로 만들 연결 오류 (요청이 서버에 닿았는지 알 수 없는 경우 포함)
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TransportError)
+
+# 토큰 갱신이 실패했을 때 다시 시도하는 간격 (초)
+RETRY_REFRESH_INTERVAL = 30
+
+class SheetsSession:
+    """연결 풀을 쓰는 인증 세션과 토큰 갱신 스레드"""
+    
+    def __init__(self, credentials, pool_size=10, timeout=60.0, refresh_margin=300.0):
+        self.credentials = credentials
+        # 동시에 시트 요청을 보내는 스레드 수(스레드 풀 + 로그/기록 스레드)보다 크게
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # 만료 refresh_margin초 전에 미리 갱신
+        self.refresh_margin = refresh_margin
+        self.rebuilds = 0
+        
+        # 토큰 발급 요청도 연결을 재사용
+        self._token_session = requests.Session()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+        self._client = None
+    
+    def _build(self):
+        """연결 풀 크기를 지정한 인증 세션 생성"""
+        session = AuthorizedSession(self.credentials, auth_request=Request(self._token_session))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        return session
+    
+    def authorize(self):
+        """토큰을 먼저 발급받고 gspread 클라이언트 생성 (갱신 스레드 시작)"""
+        self.refresh_token(raise_error=True)
+        
+        client = gspread.Client(self.credentials, session=self._build())
+        client.set_timeout(self.timeout)
+        self.wrap(client)
+        self._client = client
+        
+        self._thread = threading.Thread(target=self._refresh_loop, name='sheet-token', daemon=True)
+        self._thread.start()
+        return client
+    
+    def refresh_token(self, raise_error=False):
+        """인증 토큰 갱신"""
+        try:
+            self.credentials.refresh(Request(self._token_session))
+            return True
+        except Exception as e:
+            print(f"[SHEET ERROR] 인증 토큰 갱신 실패: {e}")
+            if raise_error:
+                raise
+            return False
+    
+    def _seconds_until_refresh(self):
+        """다음 토큰 갱신까지 남은 시간 (초)"""
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return RETRY_REFRESH_INTERVAL
+        # google-auth의 expiry는 시간대 없는 UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return max((expiry - now).total_seconds() - self.refresh_margin, RETRY_REFRESH_INTERVAL)
+    
+    def _refresh_loop(self):
+        """만료되기 전에 토큰 갱신 (요청이 토큰 갱신을 기다리지 않도록)"""
+        while not self._closed.wait(self._seconds_until_refresh()):
+            self.refresh_token()
+    
+    def rebuild(self, client, failed_session):
+        """연결 오류가 난 세션을 새 세션으로 교체 (다른 스레드가 이미 바꿨으면 그대로 둠)"""
+        with self._lock:
+            if client.session is not failed_session:
+                return
+            client.session = self._build()
+            self.rebuilds += 1
+        
+        failed_session.close()
+        print(f"[SHEET] 연결 오류로 HTTP 세션을 다시 만들었습니다. ({self.rebuilds}회)")
+    
+    def wrap(self, client):
+        """연결 오류가 나면 세션을 다시 만들고, 읽기 요청이면 한 번 더 시도하도록 client.request를 감쌈"""
+        request = client.request
+        
+        @functools.wraps(request)
+        def session_request(method, *args, **kwargs):
+            session = client.session
+            try:
+                return request(method, *args, **kwargs)
+            except TRANSPORT_ERRORS:
+                self.rebuild(client, session)
+                # 쓰기 요청은 이미 반영됐을 수 있으므로 다시 보내지 않음
+                if method != 'get':
+                    raise
+            return request(method, *args, **kwargs)
+        
+        client.request = session_request
+        return client
+    
+    def close(self):
+        """갱신 스레드 중지 후 연결 정리"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._client is not None:
+            self._client.session.close()
+        self._token_session.close()
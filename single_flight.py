@@ -0,0 +1,52 @@
+# single_flight.py
+# 같은 데이터를 동시에 읽으려는 요청을 하나로 합침
+
+import threading
+
+class _Call:
+    """진행 중인 호출 1개 (끝나면 결과나 예외를 기다리던 스레드에 전달)"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """키마다 한 번에 하나의 호출만 실행하고, 그동안 들어온 같은 키 호출은 그 결과를 나눠 받음"""
+    
+    # 결과를 캐시하지는 않음: 호출이 끝난 뒤에 들어온 요청은 새로 읽음.
+    # 나눠 받은 결과는 여러 스레드가 같은 객체를 보므로 수정하지 말 것.
+    # 실행 중인 호출에 필요한 잠금을 잡은 채로 기다리면 교착 상태가 되므로 잠금 밖에서 부를 것
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # 직접 실행하지 않고 다른 호출의 결과를 나눠 받은 횟수
+        self.shared = 0
+    
+    def do(self, key, func, *args, **kwargs):
+        """key로 진행 중인 호출이 있으면 그 결과를, 없으면 func(*args, **kwargs)를 실행해 반환"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
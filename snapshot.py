@@ -0,0 +1,55 @@
+# snapshot.py
+# 사용자/아이템 캐시 스냅샷 (재시작 직후 시트를 읽기 전에 바로 사용)
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+SNAPSHOT_VERSION = 1
+
+def content_hash(users, items):
+    """스냅샷 내용 해시 (시트와 같은지 비교할 때 사용)"""
+    payload = json.dumps([users, items], ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def save_snapshot(path, sheet_id, users, items, next_user_row):
+    """스냅샷 저장 (임시 파일에 쓴 뒤 교체하므로 중간에 죽어도 이전 스냅샷이 남음)"""
+    # users: [[행 번호, ID, 이름, ...]], items: [[아이템명, 설명, 가격, 판매여부, 사용가능여부]]
+    digest = content_hash(users, items)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'sheet_id': sheet_id,
+        'saved_at': time.time(),
+        'next_user_row': next_user_row,
+        'hash': digest,
+        'users': users,
+        'items': items
+    }
+    
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'), default=str)
+    os.replace(tmp_path, path)
+    return digest
+
+def load_snapshot(path, sheet_id):
+    """스냅샷 읽기 (없거나, 다른 시트 것이거나, 내용이 해시와 다르면 None)"""
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, EOFError, ValueError) as e:
+        print(f"[SNAPSHOT WARNING] 스냅샷을 읽을 수 없어 무시합니다: {e}")
+        return None
+    
+    if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('sheet_id') != sheet_id:
+        return None
+    if content_hash(snapshot.get('users'), snapshot.get('items')) != snapshot.get('hash'):
+        print("[SNAPSHOT WARNING] 스냅샷 내용이 손상되어 무시합니다.")
+        return None
+    
+    return snapshot
@@ -0,0 +1,430 @@
+# sqlite_storage.py
+# SQLite 저장소 (WAL 모드, 구글 시트 미러링 선택)
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from inventory import parse_inventory
+from scheduler import NORMAL, priority
+from storage import StorageBackend, KST, USER_FIELDS, to_int, user_key, user_updates
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    galleons INTEGER NOT NULL DEFAULT 0,
+    items TEXT NOT NULL DEFAULT '',
+    memo TEXT NOT NULL DEFAULT '',
+    house TEXT NOT NULL DEFAULT '',
+    last_bet_date TEXT NOT NULL DEFAULT '',
+    bet_count INTEGER NOT NULL DEFAULT 0,
+    attendance_date TEXT NOT NULL DEFAULT '',
+    last_tarot_date TEXT NOT NULL DEFAULT '',
+    house_score INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT NOT NULL DEFAULT '',
+    price INTEGER NOT NULL DEFAULT 0,
+    sellable INTEGER NOT NULL DEFAULT 0,
+    usable INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    command TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_user_name ON logs (user_name, id);
+'''
+
+def _row_to_user(row):
+    """users 테이블 행 → 사용자 딕셔너리 (SheetManager.find_user와 같은 형태)"""
+    user = {field: row[field] for field in USER_FIELDS}
+    user['row'] = None
+    user['galleons'] = to_int(user['galleons'])
+    user['bet_count'] = to_int(user['bet_count'])
+    user['house_score'] = to_int(user['house_score'])
+    user['inventory'] = parse_inventory(user['items'])
+    return user
+
+def _row_to_item(row):
+    """items 테이블 행 → 아이템 딕셔너리"""
+    return {
+        'name': row['name'],
+        'description': row['description'],
+        'price': row['price'],
+        'sellable': bool(row['sellable']),
+        'usable': bool(row['usable'])
+    }
+
+class SqliteStorage(StorageBackend):
+    """SQLite를 주 저장소로 쓰고, 선택적으로 구글 시트에 미러링하는 저장소"""
+    
+    # 모든 읽기/쓰기는 로컬 SQLite에서 끝나고, 미러(SheetManager)로의 기록은
+    # 전용 스레드 하나에서 순서대로 처리되므로 명령어가 시트를 기다리지 않음.
+    # 사용자 변경은 미러의 defer_user_updates로 넘겨 시트 기록이 실패해도 미러에 남아 다시 시도되고,
+    # 미러가 받지 못한 기록(False/예외)은 _mirror_pending에 쌓아 다음 미러 기록 전에 다시 보냄
+    
+    def __init__(self, path, mirror=None):
+        super().__init__()
+        self.path = path
+        self.mirror = mirror
+        self.catalog_version = 0
+        self._mirror_catalog_version = None
+        self._lock = threading.RLock()
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        print(f"[SQLITE] 연결 성공: {path}")
+        
+        self._mirror_executor = None
+        # 미러에 전달하지 못한 기록 [(method, args)] (미러 스레드에서만 접근)
+        self._mirror_pending = []
+        if mirror is not None:
+            self._mirror_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-mirror')
+            
+            with self._lock:
+                empty = self._conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0
+            if empty:
+                # 처음 실행할 때는 시트의 사용자 정보를 가져옴
+                self._import_users(mirror.get_all_users())
+            self._sync_items(force=True)
+    
+    def close(self):
+        """미러 기록을 마친 뒤 종료"""
+        ok = True
+        if self.mirror is not None:
+            pending = self._wait_mirror()
+            if pending:
+                print(f"[SQLITE MIRROR WARNING] 미러에 기록하지 못한 변경 {pending}개를 남기고 종료합니다.")
+            self._mirror_executor.shutdown(wait=True)
+            ok = self.mirror.close() and not pending
+        
+        with self._lock:
+            self._conn.close()
+        return ok
+    
+    # ============================================
+    # 미러링
+    # ============================================
+    
+    def _mirror_call(self, method, *args):
+        """미러에 기록 요청 (순서대로 백그라운드 실행)"""
+        if self.mirror is None:
+            return
+        
+        def run():
+            # 앞선 기록이 남아 있으면 순서가 바뀌지 않도록 뒤에 붙여 함께 다시 시도
+            self._mirror_pending.append((method, args))
+            self._retry_mirror()
+        
+        self._mirror_executor.submit(run)
+    
+    def _retry_mirror(self):
+        """미러에 전달하지 못한 기록을 순서대로 다시 보냄 (미러 스레드에서 실행, 남은 수 반환)"""
+        while self._mirror_pending:
+            method, args = self._mirror_pending[0]
+            try:
+                with priority(NORMAL):
+                    ok = getattr(self.mirror, method)(*args)
+            except Exception as e:
+                print(f"[SQLITE MIRROR ERROR] {method} 실패: {e}")
+                ok = False
+            
+            if ok is False:
+                print(f"[SQLITE MIRROR] 미러 기록 {len(self._mirror_pending)}개 대기 중 (다음 기록 때 다시 시도)")
+                break
+            self._mirror_pending.pop(0)
+        return len(self._mirror_pending)
+    
+    def _wait_mirror(self):
+        """대기 중인 미러 기록이 모두 끝날 때까지 대기 (전달하지 못한 기록도 다시 시도, 남은 수 반환)"""
+        if self.mirror is None:
+            return 0
+        return self._mirror_executor.submit(self._retry_mirror).result()
+    
+    def _import_users(self, users):
+        """사용자 목록을 그대로 저장 (미러에서 가져올 때)"""
+        columns = ', '.join(USER_FIELDS)
+        placeholders = ', '.join('?' for _ in USER_FIELDS)
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO users ({columns}) VALUES ({placeholders})',
+                [[str(user[field]) if field == 'id' else user[field] for field in USER_FIELDS] for user in users]
+            )
+        # 가져온 값으로 다음 조회 때 순위를 다시 구성
+        self.ranking.clear()
+        print(f"[SQLITE] 사용자 {len(users)}명 가져오기 완료")
+    
+    def _sync_items(self, force=False):
+        """미러의 아이템 목록이 바뀌었으면 가져옴 (미러를 읽지 못하면 로컬 목록을 그대로 두고 False)"""
+        if self.mirror is None:
+            return True
+        
+        if force and not self.mirror.reload_items():
+            print("[SQLITE MIRROR] 시트에서 아이템 목록을 읽지 못해 로컬 목록을 유지합니다.")
+            return False
+        version = self.mirror.get_catalog_version()
+        if not force and version == self._mirror_catalog_version:
+            return True
+        
+        items = self.mirror.get_all_items()
+        if not items:
+            # SheetManager.get_all_items는 읽기 오류에도 []를 돌려주므로 빈 목록으로 로컬 목록을 지우지 않음
+            with self._lock:
+                local = self._conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+            if local:
+                print("[SQLITE MIRROR] 시트에서 빈 아이템 목록을 받아 로컬 목록을 유지합니다.")
+                return False
+        
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM items')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO items (position, name, description, price, sellable, usable) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (position, item['name'], item['description'], item['price'],
+                     int(item['sellable']), int(item['usable']))
+                    for position, item in enumerate(items)
+                ]
+            )
+            self.catalog_version += 1
+        self._mirror_catalog_version = version
+        return True
+    
+    # ============================================
+    # 사용자 관리
+    # ============================================
+    
+    def find_user(self, user_id):
+        """사용자 찾기"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT * FROM users WHERE id = ?', (user_key(user_id),)
+                ).fetchone()
+            return _row_to_user(row) if row else None
+        
+        except Exception as e:
+            print(f"[ERROR] find_user 실패: {e}")
+            return None
+    
+    def get_all_users(self):
+        """등록된 모든 사용자 (등록 순서)"""
+        try:
+            with self._lock:
+                rows = self._conn.execute('SELECT * FROM users ORDER BY rowid').fetchall()
+            return [_row_to_user(row) for row in rows]
+        
+        except Exception as e:
+            print(f"[ERROR] get_all_users 실패: {e}")
+            return []
+    
+    def create_user(self, user_id, name, initial_galleons=100):
+        """새 사용자 생성"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT INTO users (id, name, galleons) VALUES (?, ?, ?)',
+                    (user_key(user_id), str(name), initial_galleons)
+                )
+            
+            self.ranking.update({'id': user_key(user_id), 'name': str(name), 'galleons': initial_galleons})
+            self._mirror_call('create_user', user_id, name, initial_galleons)
+            print(f"[USER] 새 사용자 생성: {name} (ID: {user_id})")
+            return True
+        
+        except Exception as e:
+            print(f"[ERROR] create_user 실패: {e}")
+            return False
+    
+    def update_users(self, updates_by_user):
+        """여러 사용자 정보를 하나의 SQLite 트랜잭션으로 업데이트 (미러 시트에는 모아서 기록)"""
+        try:
+            applied = {}
+            missing = False
+            
+            with self._lock, self._conn:
+                for user_id, updates in updates_by_user.items():
+                    fields = user_updates(updates)
+                    if not fields:
+                        continue
+                    
+                    assignments = ', '.join(f'{field} = ?' for field in fields)
+                    cursor = self._conn.execute(
+                        f'UPDATE users SET {assignments} WHERE id = ?',
+                        list(fields.values()) + [user_key(user_id)]
+                    )
+                    if cursor.rowcount == 0:
+                        missing = True
+                    else:
+                        applied[user_id] = fields
+            
+            for user_id, fields in applied.items():
+                self.ranking.apply(user_id, fields)
+            if applied:
+                # 바로 쓰는 update_users는 실패하면 변경을 버리므로 미뤄 둔 변경으로 넘김
+                # (기록될 때까지 미러에 남아 다시 시도됨)
+                self._mirror_call('defer_user_updates', applied)
+            return not missing
+        
+        except Exception as e:
+            print(f"[ERROR] update_users 실패: {e}")
+            return False
+    
+    def invalidate_users(self, user_id=None):
+        """시트에서 직접 수정한 사용자 정보 가져오기 (미러를 쓸 때만)"""
+        if self.mirror is None:
+            return True
+        
+        try:
+            # 아직 미러에 기록되지 않은 변경이 있으면 시트 값이 뒤처져 있으므로 가져오지 않음
+            pending = self._wait_mirror()
+            if pending:
+                print(f"[SQLITE MIRROR] 미러에 기록되지 않은 변경 {pending}개가 있어 시트에서 가져오지 않습니다.")
+                return False
+            # 미러가 미뤄 둔 변경을 기록하지 못하면 False (가져오지 않음)
+            if not self.mirror.invalidate_users(user_id):
+                return False
+            
+            if user_id is None:
+                self._import_users(self.mirror.get_all_users())
+            else:
+                user = self.mirror.find_user(user_id)
+                if user:
+                    self._import_users([user])
+            return True
+        
+        except Exception as e:
+            print(f"[ERROR] invalidate_users 실패: {e}")
+            return False
+    
+    def flush_users(self):
+        """미러의 미뤄 둔 사용자 변경 기록"""
+        if self.mirror is None:
+            return True
+        
+        if self._wait_mirror():
+            return False
+        return self.mirror.flush_users()
+    
+    # ============================================
+    # 아이템 관리
+    # ============================================
+    
+    def reload_items(self):
+        """아이템 목록 다시 읽기 (미러를 쓰면 시트에서 가져옴)"""
+        try:
+            if self.mirror is not None:
+                return self._sync_items(force=True)
+            self.catalog_version += 1
+            return True
+        
+        except Exception as e:
+            print(f"[ERROR] reload_items 실패: {e}")
+            return False
+    
+    def get_catalog_version(self):
+        """현재 아이템 목록 버전"""
+        try:
+            self._sync_items()
+        except Exception as e:
+            print(f"[ERROR] get_catalog_version 실패: {e}")
+        return self.catalog_version
+    
+    def find_item(self, item_name):
+        """아이템 정보 찾기"""
+        try:
+            self._sync_items()
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT * FROM items WHERE name = ?', (str(item_name).strip(),)
+                ).fetchone()
+            return _row_to_item(row) if row else None
+        
+        except Exception as e:
+            print(f"[ERROR] find_item 실패: {e}")
+            return None
+    
+    def get_all_items(self, sellable_only=False):
+        """모든 아이템 목록 가져오기"""
+        try:
+            self._sync_items()
+            query = 'SELECT * FROM items'
+            if sellable_only:
+                query += ' WHERE sellable = 1'
+            
+            with self._lock:
+                rows = self._conn.execute(query + ' ORDER BY position').fetchall()
+            return [_row_to_item(row) for row in rows]
+        
+        except Exception as e:
+            print(f"[ERROR] get_all_items 실패: {e}")
+            return []
+    
+    # ============================================
+    # 로그
+    # ============================================
+    
+    def log_message(self, user, command, content):
+        """로그 기록"""
+        try:
+            timestamp = datetime.now(KST).strftime('%Y-%m-%d %H:%M:%S')
+            
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT INTO logs (timestamp, user_name, command, content) VALUES (?, ?, ?, ?)',
+                    (timestamp, str(user), str(command), str(content))
+                )
+            
+            self._mirror_call('log_message', user, command, content)
+            return True
+        
+        except Exception as e:
+            print(f"[LOG ERROR] {e}")
+            return False
+    
+    def get_recent_logs(self, limit=10):
+        """최근 로그 조회 (로그 시트와 같은 키)"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT * FROM logs ORDER BY id DESC LIMIT ?', (limit,)
+                ).fetchall()
+            
+            return [
+                {'타임스탬프': row['timestamp'], '사용자': row['user_name'],
+                 '명령어': row['command'], '내용': row['content']}
+                for row in rows
+            ]
+        
+        except Exception as e:
+            print(f"[LOG ERROR] {e}")
+            return []
+    
+    def get_user_logs(self, user_name, limit=10):
+        """사용자의 최근 로그 조회 (user_name 인덱스 사용)"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT * FROM logs WHERE user_name = ? ORDER BY id DESC LIMIT ?',
+                    (str(user_name).strip(), limit)
+                ).fetchall()
+            
+            return [
+                {'타임스탬프': row['timestamp'], '사용자': row['user_name'],
+                 '명령어': row['command'], '내용': row['content']}
+                for row in rows
+            ]
+        
+        except Exception as e:
+            print(f"[LOG ERROR] {e}")
+            return []
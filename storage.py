@@ -0,0 +1,303 @@
+# storage.py
+# 저장소 공통 인터페이스 (구글 시트 / SQLite)
+
+import abc
+import threading
+import pytz
+from inventory import parse_inventory, format_inventory
+from ranking import RankingIndex
+
+KST = pytz.timezone('Asia/Seoul')
+
+# 사용자 필드 (사용자 시트 열 순서)
+USER_FIELDS = [
+    'id', 'name', 'galleons', 'items', 'memo', 'house', 'last_bet_date',
+    'bet_count', 'attendance_date', 'last_tarot_date', 'house_score'
+]
+
+def to_int(value, default=0):
+    """저장된 값을 정수로 변환 (빈 칸은 기본값)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def user_key(user_id):
+    """사용자 ID 정규화 (캐시/잠금 키)"""
+    return str(user_id).strip()
+
+def apply_fields(user, fields):
+    """사용자 딕셔너리에 변경 필드 반영 (아이템 칸이 바뀌면 파싱 결과도 갱신)"""
+    user.update(fields)
+    if 'items' in fields:
+        user['inventory'] = parse_inventory(fields['items'])
+
+def copy_user(user):
+    """캐시 밖으로 내보낼 사용자 복사본"""
+    copied = dict(user)
+    copied['inventory'] = dict(user['inventory'])
+    return copied
+
+def user_updates(updates):
+    """변경 가능한 사용자 필드만 추림 (ID는 바꿀 수 없음)"""
+    return {k: v for k, v in updates.items() if k in USER_FIELDS and k != 'id'}
+
+class Transaction:
+    """여러 사용자 변경을 모아 한 번의 요청으로 기록하는 트랜잭션"""
+    
+    # 캐시된 행의 복사본 위에서 작업하므로, 커밋하지 않으면 아무것도 바뀌지 않음
+    
+    def __init__(self, users):
+        self._users = users
+        self._changes = {}
+        self.aborted = False
+        self.committed = False
+        # True면 커밋할 때 defer_user_updates로 기록 (캐시에 바로 반영, 시트 기록은 모아서)
+        self.deferred = False
+    
+    def user(self, user_id):
+        """트랜잭션 안의 사용자 (등록되지 않았으면 None)"""
+        return self._users.get(user_key(user_id))
+    
+    def update(self, user_id, fields):
+        """사용자 필드 변경"""
+        user = self.user(user_id)
+        if not user:
+            raise KeyError(f'트랜잭션에 없는 사용자: {user_id}')
+        
+        apply_fields(user, fields)
+        self._changes.setdefault(user_key(user_id), {}).update(fields)
+    
+    def add_galleons(self, user_id, amount):
+        """갈레온 증감"""
+        user = self.user(user_id)
+        self.update(user_id, {'galleons': user['galleons'] + amount})
+    
+    def add_item(self, user_id, item_name, count=1):
+        """아이템 추가"""
+        counts = dict(self.user(user_id)['inventory'])
+        counts[item_name] = counts.get(item_name, 0) + count
+        self.update(user_id, {'items': format_inventory(counts)})
+    
+    def remove_item(self, user_id, item_name, count=1):
+        """아이템 제거 (부족하면 False)"""
+        counts = dict(self.user(user_id)['inventory'])
+        if counts.get(item_name, 0) < count:
+            return False
+        
+        counts[item_name] -= count
+        if counts[item_name] == 0:
+            del counts[item_name]
+        self.update(user_id, {'items': format_inventory(counts)})
+        return True
+    
+    def abort(self):
+        """변경 사항 버림"""
+        self.aborted = True
+        self._changes = {}
+    
+    def changes(self):
+        """커밋할 변경 사항 ({user_id: fields})"""
+        return self._changes
+
+class StorageBackend(abc.ABC):
+    """사용자/아이템/로그 저장소 인터페이스"""
+    
+    # 하위 클래스는 abstractmethod만 구현하면 되고,
+    # 아이템 추가/제거/트랜잭션 등은 아래 기본 구현을 그대로 사용할 수 있음
+    
+    def __init__(self):
+        self._user_locks = {}
+        self._user_locks_guard = threading.Lock()
+        # 갈레온/기숙사 순위 (하위 클래스가 사용자 변경 시 갱신)
+        self.ranking = RankingIndex()
+    
+    def _user_lock(self, user_id):
+        """사용자별 잠금 (읽기-수정-쓰기 보호)"""
+        with self._user_locks_guard:
+            return self._user_locks.setdefault(user_key(user_id), threading.Lock())
+    
+    def close(self):
+        """남은 기록 마무리 후 종료"""
+        return True
+    
+    # ============================================
+    # 사용자 관리
+    # ============================================
+    
+    @abc.abstractmethod
+    def find_user(self, user_id):
+        """사용자 찾기 (없으면 None)"""
+    
+    @abc.abstractmethod
+    def get_all_users(self):
+        """등록된 모든 사용자"""
+    
+    @abc.abstractmethod
+    def create_user(self, user_id, name, initial_galleons=100):
+        """새 사용자 생성"""
+    
+    @abc.abstractmethod
+    def update_users(self, updates_by_user):
+        """여러 사용자 정보를 한 번에 업데이트 ({user_id: updates})"""
+    
+    def update_user(self, user_id, updates):
+        """사용자 정보 업데이트"""
+        return self.update_users({user_id: updates})
+    
+    def invalidate_users(self, user_id=None):
+        """외부에서 수정된 사용자 정보 다시 읽기"""
+        return True
+    
+    def defer_user_updates(self, updates_by_user):
+        """조금 늦게 기록해도 되는 사용자 변경 (기본은 바로 기록)"""
+        return self.update_users(updates_by_user)
+    
+    def flush_users(self):
+        """미뤄 둔 사용자 변경 기록"""
+        return True
+    
+    def begin_transaction(self, user_ids):
+        """사용자 복사본으로 트랜잭션 시작"""
+        users = {}
+        for user_id in user_ids:
+            user = self.find_user(user_id)
+            if user:
+                users[user_key(user_id)] = user
+        return Transaction(users)
+    
+    def commit_transaction(self, transaction):
+        """트랜잭션의 모든 변경을 한 번에 기록"""
+        changes = transaction.changes()
+        if transaction.aborted or not changes:
+            transaction.committed = not transaction.aborted
+            return transaction.committed
+        
+        if transaction.deferred:
+            transaction.committed = self.defer_user_updates(changes)
+        else:
+            transaction.committed = self.update_users(changes)
+        return transaction.committed
+    
+    # ============================================
+    # 순위
+    # ============================================
+    
+    def _ensure_ranking(self):
+        """순위 인덱스가 비어 있으면 전체 사용자로 구성"""
+        if not self.ranking.loaded:
+            self.ranking.rebuild(self.get_all_users())
+    
+    def get_top_users(self, limit=10):
+        """갈레온 상위 사용자"""
+        try:
+            self._ensure_ranking()
+            return self.ranking.top(limit)
+        except Exception as e:
+            print(f"[ERROR] get_top_users 실패: {e}")
+            return []
+    
+    def get_user_rank(self, user_id):
+        """사용자의 갈레온 순위 (없으면 None)"""
+        try:
+            self._ensure_ranking()
+            return self.ranking.rank(user_id)
+        except Exception as e:
+            print(f"[ERROR] get_user_rank 실패: {e}")
+            return None
+    
+    def get_house_ranking(self):
+        """기숙사 점수 합계 순위"""
+        try:
+            self._ensure_ranking()
+            return self.ranking.houses()
+        except Exception as e:
+            print(f"[ERROR] get_house_ranking 실패: {e}")
+            return []
+    
+    # ============================================
+    # 아이템 관리
+    # ============================================
+    
+    @abc.abstractmethod
+    def find_item(self, item_name):
+        """아이템 정보 찾기"""
+    
+    @abc.abstractmethod
+    def get_all_items(self, sellable_only=False):
+        """모든 아이템 목록"""
+    
+    @abc.abstractmethod
+    def reload_items(self):
+        """아이템 목록 다시 읽기"""
+    
+    @abc.abstractmethod
+    def get_catalog_version(self):
+        """아이템 목록 버전 (목록이 바뀔 때마다 증가)"""
+    
+    def add_item_to_user(self, user_id, item_name, count=1):
+        """사용자에게 아이템 추가"""
+        with self._user_lock(user_id):
+            user = self.find_user(user_id)
+            if not user:
+                return False
+            
+            counts = user['inventory']
+            counts[item_name] = counts.get(item_name, 0) + count
+            return self.update_user(user_id, {'items': format_inventory(counts)})
+    
+    def remove_item_from_user(self, user_id, item_name, count=1):
+        """사용자에게서 아이템 제거"""
+        with self._user_lock(user_id):
+            user = self.find_user(user_id)
+            if not user or user['inventory'].get(item_name, 0) < count:
+                return False
+            
+            counts = user['inventory']
+            counts[item_name] -= count
+            if counts[item_name] == 0:
+                del counts[item_name]
+            return self.update_user(user_id, {'items': format_inventory(counts)})
+    
+    def get_user_items(self, user_id):
+        """사용자 아이템 목록 ({아이템명: 개수})"""
+        user = self.find_user(user_id)
+        return user['inventory'] if user else {}
+    
+    def count_user_item(self, user_id, item_name):
+        """사용자가 가진 특정 아이템 개수"""
+        return self.get_user_items(user_id).get(item_name, 0)
+    
+    def migrate_inventories(self):
+        """예전 형식(이름 반복) 아이템 칸을 "이름:개수" 형식으로 일괄 변환, 변환한 인원 수 반환"""
+        updates = {}
+        for user in self.get_all_users():
+            encoded = format_inventory(user['inventory'])
+            if encoded != str(user['items'] or ''):
+                updates[user_key(user['id'])] = {'items': encoded}
+        
+        if updates and not self.update_users(updates):
+            return None
+        
+        print(f"[USER] 아이템 칸 변환 완료: {len(updates)}명")
+        return len(updates)
+    
+    # ============================================
+    # 로그
+    # ============================================
+    
+    @abc.abstractmethod
+    def log_message(self, user, command, content):
+        """로그 기록"""
+    
+    @abc.abstractmethod
+    def get_recent_logs(self, limit=10):
+        """최근 로그 조회 (최신순)"""
+    
+    @abc.abstractmethod
+    def get_user_logs(self, user_name, limit=10):
+        """사용자의 최근 로그 조회 (최신순)"""
+    
+    def flush_logs(self):
+        """미뤄 둔 로그 기록"""
+        return True